@@ -0,0 +1,299 @@
+"""Measures request round trips between a Server and many Clients on localhost.
+
+The server runs in a child process with a stub bot, so the clients driving it
+don't compete with it for the event loop. Every combination of payload size,
+concurrency and connection count is run, reporting requests per second,
+p50/p99 latency and how much the resident memory of both processes grew
+while the scenario ran.
+
+    python benchmarks/roundtrip.py --save baseline.json
+    python benchmarks/roundtrip.py --compare baseline.json
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from discord.ext import ipc  # noqa: E402
+
+SECRET_KEY = "benchmark"
+
+
+def current_memory():
+    """Returns the resident memory of this process in KiB, if it can be measured.
+
+    Unlike the peak from ``getrusage``, which never goes down, the current
+    figure shows what each scenario adds on top of the ones run before it.
+    Only Linux exposes it without extra dependencies.
+    """
+    try:
+        with open("/proc/self/statm") as stream:
+            pages = int(stream.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+
+    return pages * os.sysconf("SC_PAGE_SIZE") // 1024
+
+
+def growth(before, after):
+    if before is None or after is None:
+        return None
+
+    return after - before
+
+
+class StubBot:
+    """Just enough of a bot for the server to run without connecting to Discord."""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.cogs = {}
+
+    def dispatch(self, event, *args):
+        pass
+
+    def get_cog(self, name):
+        return self.cogs.get(name)
+
+
+def serve(args):
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    server = ipc.Server(
+        StubBot(loop),
+        port=args.port,
+        secret_key=SECRET_KEY,
+        do_multicast=False,
+        concurrent=True,
+        max_concurrency=args.max_concurrency,
+        serializers=args.serializers,
+    )
+
+    @server.route()
+    async def echo(payload: str):
+        return payload
+
+    @server.route()
+    async def memory():
+        return current_memory()
+
+    server.start()
+
+    # Tell the parent process the server is listening.
+    print("ready", flush=True)
+
+    loop.run_forever()
+
+
+async def run_scenario(args, size, concurrency, connections):
+    """Sends ``args.requests`` requests from ``concurrency`` workers spread over
+    ``connections`` clients, returning the results of the scenario."""
+    clients = [
+        ipc.Client(port=args.port, secret_key=SECRET_KEY, serializers=args.serializers)
+        for _ in range(connections)
+    ]
+
+    payload = "x" * size
+    latencies = []
+    remaining = itertools.count(args.requests, -1)
+
+    async def worker(client):
+        while next(remaining) > 0:
+            started = time.perf_counter()
+            response = await client.request("echo", payload=payload)
+            latencies.append(time.perf_counter() - started)
+
+            if response != payload:
+                raise RuntimeError("Unexpected response: {!r}".format(response)[:200])
+
+    try:
+        # Warm up every client's connection before timing anything.
+        await asyncio.gather(*(client.request("echo", payload="") for client in clients))
+
+        client_memory = current_memory()
+        server_memory = await clients[0].request("memory")
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(clients[i % connections]) for i in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+        client_memory = growth(client_memory, current_memory())
+        server_memory = growth(server_memory, await clients[0].request("memory"))
+    finally:
+        for client in clients:
+            if client.session is not None:
+                await client.session.close()
+
+    latencies.sort()
+
+    return {
+        "name": "size={} concurrency={} connections={}".format(size, concurrency, connections),
+        "size": size,
+        "concurrency": concurrency,
+        "connections": connections,
+        "requests": len(latencies),
+        "rps": len(latencies) / elapsed,
+        "p50": statistics.median(latencies) * 1000,
+        "p99": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+        "client_memory": client_memory,
+        "server_memory": server_memory,
+    }
+
+
+def format_memory(kib):
+    return "-" if kib is None else "{:+.1f}".format(kib / 1024)
+
+
+def report(results, baseline=None, threshold=10.0):
+    header = "{:<45} {:>10} {:>9} {:>9} {:>11} {:>11}".format(
+        "scenario", "req/s", "p50 ms", "p99 ms", "client ΔMiB", "server ΔMiB"
+    )
+
+    if baseline is not None:
+        header += " {:>9} {:>9}".format("req/s Δ", "p99 Δ")
+
+    print(header)
+    print("-" * len(header))
+
+    regressions = []
+
+    for result in results:
+        line = "{:<45} {:>10.0f} {:>9.3f} {:>9.3f} {:>11} {:>11}".format(
+            result["name"],
+            result["rps"],
+            result["p50"],
+            result["p99"],
+            format_memory(result["client_memory"]),
+            format_memory(result["server_memory"]),
+        )
+
+        old = baseline.get(result["name"]) if baseline is not None else None
+
+        if old is not None:
+            rps_change = (result["rps"] - old["rps"]) / old["rps"] * 100
+            p99_change = (result["p99"] - old["p99"]) / old["p99"] * 100
+            line += " {:>+8.1f}% {:>+8.1f}%".format(rps_change, p99_change)
+
+            if rps_change < -threshold or p99_change > threshold:
+                regressions.append(result["name"])
+        elif baseline is not None:
+            line += " {:>9} {:>9}".format("new", "new")
+
+        print(line)
+
+    return regressions
+
+
+async def benchmark(args):
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            os.path.abspath(__file__),
+            "--serve",
+            "--port",
+            str(args.port),
+            "--max-concurrency",
+            str(args.max_concurrency),
+            "--serializers",
+            *args.serializers,
+        ],
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+    )
+
+    try:
+        if server.stdout.readline().strip() != "ready":
+            raise RuntimeError("The benchmark server failed to start")
+
+        results = []
+
+        for size, concurrency, connections in itertools.product(
+            args.sizes, args.concurrency, args.connections
+        ):
+            runs = [
+                await run_scenario(args, size, concurrency, connections) for _ in range(args.repeat)
+            ]
+
+            # Keep the median run, so one noisy run doesn't skew a comparison.
+            runs.sort(key=lambda run: run["rps"])
+            result = runs[len(runs) // 2]
+            results.append(result)
+
+            print("{name}: {rps:.0f} req/s".format(**result), file=sys.stderr)
+
+        return results
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--port", type=int, default=18765)
+    parser.add_argument("--requests", type=int, default=5000, help="requests sent per scenario")
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="runs per scenario, the median run is reported"
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=[64, 4096, 65536])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 128])
+    parser.add_argument("--connections", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--serializers", nargs="+", default=["json"])
+    parser.add_argument("--max-concurrency", type=int, default=1000)
+    parser.add_argument("--save", metavar="PATH", help="save the results as a baseline")
+    parser.add_argument("--compare", metavar="PATH", help="compare against a saved baseline")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=10.0,
+        help="percentage drop in req/s or rise in p99 reported as a regression",
+    )
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+
+    if args.serve:
+        return serve(args)
+
+    baseline = None
+
+    if args.compare:
+        with open(args.compare) as stream:
+            baseline = {result["name"]: result for result in json.load(stream)["results"]}
+
+    results = asyncio.get_event_loop().run_until_complete(benchmark(args))
+
+    regressions = report(results, baseline, args.threshold)
+
+    if args.save:
+        with open(args.save, "w") as stream:
+            json.dump(
+                {
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "results": results,
+                },
+                stream,
+                indent=4,
+            )
+
+    if regressions:
+        print("\nRegressed beyond {}%:".format(args.threshold), file=sys.stderr)
+
+        for name in regressions:
+            print("  " + name, file=sys.stderr)
+
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,10 @@
 import collections
 
+from discord.ext.ipc.cache import ResponseCache
 from discord.ext.ipc.client import Client
+from discord.ext.ipc.cluster import ClusterClient
 from discord.ext.ipc.server import Server
+from discord.ext.ipc.sync import SyncClient
 from discord.ext.ipc.errors import *
 
 
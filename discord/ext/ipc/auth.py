@@ -0,0 +1,43 @@
+import binascii
+import hashlib
+import hmac
+import os
+
+
+def _key(secret_key):
+    if secret_key is None:
+        return b""
+
+    if isinstance(secret_key, str):
+        return secret_key.encode("utf-8")
+
+    return bytes(secret_key)
+
+
+def check_key(secret_key, given):
+    """Compares a secret key sent with a message to the server's, in constant time."""
+    # Anything else comes from an unauthenticated client, and bytes() of an int
+    # allocates that many bytes.
+    if given is not None and not isinstance(given, (str, bytes, bytearray)):
+        return False
+
+    return hmac.compare_digest(_key(secret_key), _key(given))
+
+
+def new_challenge():
+    """Returns a random challenge for a client to sign when its connection opens."""
+    return binascii.hexlify(os.urandom(32)).decode("ascii")
+
+
+def sign(secret_key, challenge):
+    """Returns the HMAC-SHA256 of a challenge keyed with the secret key, as hex."""
+    return hmac.new(_key(secret_key), challenge.encode("ascii"), hashlib.sha256).hexdigest()
+
+
+def verify(secret_key, challenge, signature):
+    """Checks the signature a client sent for a challenge, in constant time."""
+    try:
+        return hmac.compare_digest(sign(secret_key, challenge), signature)
+    except TypeError:
+        # Not a string, or not ASCII.
+        return False
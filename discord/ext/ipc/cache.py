@@ -0,0 +1,180 @@
+import asyncio
+import collections
+import json
+import logging
+import time
+
+log = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """An opt-in cache for :class:`~discord.ext.ipc.client.Client` responses.
+    :class:`~discord.ext.ipc.server.Server` also uses one to memoize routes.
+
+    Responses are keyed on the endpoint and the request data, and only
+    endpoints with a TTL are cached. Concurrent requests for a key that is
+    not cached yet share a single request to the server.
+
+    Parameters
+    ----------
+    ttl: Dict[str, float]
+        A mapping of endpoint names to how long, in seconds, their responses are kept.
+    default_ttl: float
+        How long responses of endpoints not in ``ttl`` are kept. If not supplied
+        those endpoints are not cached, defaults to None
+    max_size: int
+        The approximate number of bytes the cached responses may take up before the
+        least recently used ones are evicted, defaults to 16 MiB
+    """
+
+    def __init__(self, ttl=None, default_ttl=None, max_size=16 * 1024 * 1024):
+        self.ttl = dict(ttl or {})
+        self.default_ttl = default_ttl
+        self.max_size = max_size
+
+        self.size = 0
+
+        self._entries = collections.OrderedDict()
+        self._in_flight = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return "<ResponseCache entries={0} size={1.size}>".format(len(self), self)
+
+    def ttl_for(self, endpoint):
+        """Returns how long responses of an endpoint are cached for, or None if they are not."""
+        return self.ttl.get(endpoint, self.default_ttl)
+
+    @staticmethod
+    def key(endpoint, data):
+        """Returns the cache key of a request.
+
+        Parameters
+        ----------
+        endpoint: str
+            The endpoint requested.
+        data: dict
+            The data sent to the endpoint.
+        """
+        return endpoint, json.dumps(data, sort_keys=True, separators=(",", ":"), default=repr)
+
+    def get(self, key):
+        """Returns a tuple of whether the key is cached and its cached response."""
+        entry = self._entries.get(key)
+
+        if entry is None:
+            return False, None
+
+        expires, size, value = entry
+
+        if expires <= time.monotonic():
+            self._remove(key)
+            return False, None
+
+        self._entries.move_to_end(key)
+
+        return True, value
+
+    def set(self, key, value, ttl):
+        """Caches a response under a key for ``ttl`` seconds."""
+        size = len(key[0]) + len(key[1]) + len(json.dumps(value, default=repr))
+
+        if size > self.max_size:
+            return
+
+        self._remove(key)
+
+        self._entries[key] = (time.monotonic() + ttl, size, value)
+        self.size += size
+
+        while self.size > self.max_size:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+
+        if entry is not None:
+            self.size -= entry[1]
+
+    def invalidate(self, endpoint, data=None):
+        """Removes cached responses.
+
+        Parameters
+        ----------
+        endpoint: str
+            The endpoint to remove responses for.
+        data: dict
+            The request data to remove the response for. If not supplied every
+            response of the endpoint is removed, defaults to None
+        """
+        if data is not None:
+            keys = [self.key(endpoint, data)]
+        else:
+            keys = [key for key in self._entries if key[0] == endpoint]
+            keys.extend(key for key in self._in_flight if key[0] == endpoint)
+
+        for key in keys:
+            self._remove(key)
+            self._in_flight.pop(key, None)
+
+        log.debug("Invalidated %d cached responses for %r", len(keys), endpoint)
+
+    def clear(self):
+        """Removes every cached response."""
+        self._entries.clear()
+        self._in_flight.clear()
+        self.size = 0
+
+    async def fetch(self, endpoint, data, request):
+        """Returns a cached response, or makes the request and caches its response.
+
+        Parameters
+        ----------
+        endpoint: str
+            The endpoint requested.
+        data: dict
+            The data sent to the endpoint.
+        request: Callable[[], Awaitable]
+            Makes the request to the server on a cache miss.
+        """
+        ttl = self.ttl_for(endpoint)
+
+        if ttl is None:
+            return await request()
+
+        key = self.key(endpoint, data)
+        hit, value = self.get(key)
+
+        if hit:
+            return value
+
+        task = self._in_flight.get(key)
+
+        if task is None:
+            task = asyncio.ensure_future(request())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda task: self._store(key, ttl, task))
+
+        # Shielded so one caller giving up doesn't cancel the request for the rest.
+        return await asyncio.shield(task)
+
+    def _store(self, key, ttl, task):
+        # A request which was invalidated while in flight is not cached.
+        if self._in_flight.get(key) is not task:
+            return
+
+        del self._in_flight[key]
+
+        if task.cancelled() or task.exception() is not None:
+            return
+
+        value = task.result()
+
+        # Error responses are never cached.
+        if isinstance(value, dict) and "error" in value and "code" in value:
+            return
+
+        self.set(key, value, ttl)
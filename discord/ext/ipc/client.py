@@ -1,13 +1,458 @@
 import asyncio
+import functools
+import collections
+import itertools
 import logging
+import random
 import typing
+import weakref
 
 import aiohttp
+from discord.ext.ipc.auth import sign
+from discord.ext.ipc.compression import ALGORITHMS, Compression, decompress
 from discord.ext.ipc.errors import *
+from discord.ext.ipc.metrics import Metrics, request_label, response_code
+from discord.ext.ipc.serializers import negotiated_serializer, resolve_serializers
 
 log = logging.getLogger(__name__)
 
 
+class IpcConnection:
+    """A single websocket connection to the IPC server.
+
+    Requests are tagged with a nonce which the server echoes back, and a
+    single reader task hands each response to the request waiting on it,
+    so any number of requests can be in flight on one connection.
+
+    Attributes
+    ----------
+    websocket: :class:`~aiohttp.ClientWebSocketResponse`
+        The underlying websocket connection.
+    serializer: :class:`~discord.ext.ipc.serializers.Serializer`
+        The wire format negotiated with the server.
+    authenticated: bool
+        Whether the connection was authenticated when it opened. Requests on
+        connections which weren't carry the secret key instead.
+    compression: Optional[:class:`~discord.ext.ipc.compression.Compression`]
+        Compresses large requests, if the server can decompress them.
+    legacy: bool
+        Whether the server predates the handshake, and so answers requests one
+        at a time without echoing their nonce. Requests on such connections are
+        sent one at a time, and the connection is closed when one is given up
+        on, as its response could no longer be told apart from the next one's.
+    """
+
+    def __init__(self, client, websocket, authenticated=False, compression=None, legacy=False):
+        self.client = client
+        self.websocket = websocket
+        self.serializer = negotiated_serializer(websocket.protocol)
+        self.authenticated = authenticated
+        self.compression = compression
+        self.legacy = legacy
+
+        self._aborted = False
+        self._lock = asyncio.Lock()
+        self._pending = {}
+        # Streams are only held weakly, so one abandoned without being closed
+        # can be collected and cancelled.
+        self._streams = weakref.WeakValueDictionary()
+        self._reader = client.loop.create_task(self._read_loop())
+
+    @property
+    def closed(self):
+        """bool: Whether the connection can no longer be used."""
+        return self._aborted or self.websocket.closed or self._reader.done()
+
+    @property
+    def in_flight(self):
+        """int: The number of requests and streams awaiting a response on this connection."""
+        return len(self._pending) + len(self._streams)
+
+    async def _read_loop(self):
+        websocket = self.websocket
+
+        try:
+            while True:
+                recv = await websocket.receive()
+
+                log.debug("Client < %r", recv)
+
+                if recv.type == aiohttp.WSMsgType.PING:
+                    log.info("Received request to PING")
+                    await websocket.pong(recv.data)
+                    continue
+
+                if recv.type == aiohttp.WSMsgType.PONG:
+                    log.info("Received PONG")
+                    continue
+
+                if recv.type == aiohttp.WSMsgType.CLOSE:
+                    # Connections don't close automatically, so the server
+                    # would otherwise wait for the closing handshake to time out.
+                    await websocket.close()
+                    break
+
+                if recv.type in (
+                    aiohttp.WSMsgType.CLOSING,
+                    aiohttp.WSMsgType.CLOSED,
+                    aiohttp.WSMsgType.ERROR,
+                ):
+                    break
+
+                response = self.serializer.loads(decompress(recv.data))
+
+                if self.legacy:
+                    # Responses are bare, and answer the one request in flight.
+                    future = self._pending.pop(next(iter(self._pending), None), None)
+
+                    if future is not None and not future.done():
+                        future.set_result((response, len(recv.data)))
+                    continue
+
+                if "closing" in response:
+                    # The server is shutting down. New requests go to other
+                    # connections while the ones in flight are responded to here.
+                    log.info("IPC server is shutting down, moving requests off the connection.")
+                    self.client._connection_lost(self)
+                    continue
+
+                if "invalidate" in response:
+                    self.client._handle_invalidate(response)
+                    continue
+
+                if "event" in response:
+                    self.client._handle_event(response)
+                    continue
+
+                stream = self._streams.get(response.get("nonce"))
+
+                if stream is not None:
+                    stream._feed(response)
+
+                    # Don't keep the stream alive while waiting for the next message.
+                    del stream
+                    continue
+
+                future = self._pending.pop(response.get("nonce"), None)
+
+                if future is None:
+                    log.debug("Received response for unknown nonce %r", response.get("nonce"))
+                elif not future.done():
+                    future.set_result((response.get("data"), len(recv.data)))
+        finally:
+            pending, self._pending = self._pending, {}
+
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(NotConnected("WebSocket connection closed."))
+
+            streams, self._streams = self._streams, weakref.WeakValueDictionary()
+
+            for stream in list(streams.values()):
+                stream._feed(NotConnected("WebSocket connection closed."))
+
+            self.client._connection_lost(self)
+
+    async def request(self, payload, deadline=None):
+        """Sends a request payload and waits for its response.
+
+        Parameters
+        ----------
+        payload: dict
+            The request to send. A nonce is added to it.
+        deadline: float
+            The loop time by which the response must have arrived. The time left
+            is sent along, so the server can give up on the request too.
+
+        Raises
+        ------
+        ConnectionResetError
+            The request could not be sent, so the server never saw it.
+        NotConnected
+            The connection was lost after the request was sent.
+        """
+        if not self.legacy:
+            return await self._request(payload, deadline)
+
+        async with self._lock:
+            # The previous request may have been given up on, closing the connection.
+            if self.closed:
+                raise ConnectionResetError("WebSocket connection closed.")
+
+            return await self._request(payload, deadline)
+
+    async def _request(self, payload, deadline=None):
+        nonce = next(self.client._nonce)
+        payload["nonce"] = nonce
+
+        if not self.authenticated:
+            payload["headers"] = {"Authorization": self.client.secret_key}
+
+        timeout = None
+
+        if deadline is not None:
+            timeout = deadline - self.client.loop.time()
+
+            if timeout <= 0:
+                raise RequestTimeout("Request timed out before it could be sent.")
+
+            payload["timeout"] = timeout
+
+        future = self.client.loop.create_future()
+        self._pending[nonce] = future
+
+        metrics = self.client.metrics
+
+        if metrics is not None:
+            endpoint = request_label(payload)
+            started = metrics.start(endpoint)
+            code = "disconnected"
+
+        try:
+            data = self.serializer.dumps(payload)
+            size = await self.serializer.send_dumped(self.websocket, data, self.compression)
+
+            log.debug("Client > %r", payload)
+
+            try:
+                response, received = await asyncio.wait_for(future, timeout)
+            except asyncio.TimeoutError:
+                if metrics is not None:
+                    code = "timeout"
+
+                self._cancel(nonce)
+                raise RequestTimeout(
+                    "Request {} timed out after {:.2f} seconds.".format(nonce, timeout)
+                ) from None
+            except asyncio.CancelledError:
+                if metrics is not None:
+                    code = "cancelled"
+
+                self._cancel(nonce)
+                raise
+
+            if metrics is not None:
+                code = response_code(response)
+                metrics.sent(endpoint, size, len(data) - size)
+                metrics.received(endpoint, received)
+
+            return response
+        finally:
+            self._pending.pop(nonce, None)
+
+            if metrics is not None:
+                metrics.finish(endpoint, started, code)
+
+    def _cancel(self, nonce):
+        """Tells the server to stop processing a request nothing is waiting on anymore."""
+        if self.closed:
+            return
+
+        if self.legacy:
+            # The server can't be told, and its response would be taken for the next one's.
+            self.abort()
+            self.client.loop.create_task(self.websocket.close())
+            return
+
+        async def cancel():
+            try:
+                await self.serializer.send(self.websocket, {"cancel": nonce})
+            except (ConnectionResetError, RuntimeError):
+                pass
+
+        self.client.loop.create_task(cancel())
+
+    async def open_stream(self, stream, payload):
+        """Sends a streaming request payload. Its chunks are fed to ``stream``.
+
+        Parameters
+        ----------
+        stream: :class:`IpcStream`
+            The stream to feed the response to.
+        payload: dict
+            The request to send. A nonce is added to it.
+        """
+        nonce = next(self.client._nonce)
+        payload["nonce"] = nonce
+
+        if not self.authenticated:
+            payload["headers"] = {"Authorization": self.client.secret_key}
+
+        self._streams[nonce] = stream
+
+        try:
+            await self.serializer.send(self.websocket, payload, self.compression)
+        except BaseException:
+            self._streams.pop(nonce, None)
+            raise
+
+        log.debug("Client > %r", payload)
+
+        return nonce
+
+    async def close_stream(self, nonce, cancel=False):
+        """Stops feeding a stream, optionally telling the server to stop sending it."""
+        self._streams.pop(nonce, None)
+
+        if cancel and nonce is not None and not self.closed:
+            await self.serializer.send(self.websocket, {"cancel": nonce})
+
+    async def close(self):
+        """Closes the websocket connection."""
+        await self.websocket.close()
+
+    def abort(self):
+        """Drops a connection found broken before its reader noticed, failing
+        the requests waiting on it."""
+        self._aborted = True
+        self._reader.cancel()
+        self.client._connection_lost(self)
+
+
+def _abandoned(connection, nonce):
+    # Called when a stream is garbage collected before it finished.
+    if not connection.client.loop.is_closed():
+        connection._cancel(nonce)
+
+
+class IpcStream:
+    """An asynchronous iterator over the response of a streaming route.
+
+    Returned by :meth:`Client.stream`. The server only sends a bounded number
+    of chunks ahead of what has been consumed, so memory stays flat however
+    large the response is.
+
+    If the route does not stream, its whole response is the only item. Errors
+    are yielded as the last item, in the same format :meth:`Client.request`
+    returns them.
+
+    Streams which are not read to the end should be stopped with
+    :meth:`aclose`, or used as an asynchronous context manager. Streams which
+    are dropped without either are cancelled once they are garbage collected.
+    """
+
+    def __init__(self, client, endpoint, data, window):
+        self.client = client
+        self.endpoint = endpoint
+        self.data = data
+        self.window = window
+
+        self._connection = None
+        self._nonce = None
+        self._queue = asyncio.Queue()
+        self._consumed = 0
+        self._done = False
+        self._finalizer = None
+
+    def __aiter__(self):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def __anext__(self):
+        if self._done:
+            raise StopAsyncIteration
+
+        if self._connection is None:
+            await self._start()
+
+        frame = await self._queue.get()
+
+        if isinstance(frame, Exception):
+            await self._finish()
+            raise frame
+
+        if "chunk" in frame:
+            self._consumed += 1
+
+            # Acknowledge in batches of half the window to keep the server
+            # sending without an acknowledgement for every chunk.
+            if self._consumed >= max(1, self.window // 2):
+                count, self._consumed = self._consumed, 0
+                await self._connection.serializer.send(
+                    self._connection.websocket, {"ack": self._nonce, "count": count}
+                )
+
+            return frame["chunk"]
+
+        await self._finish()
+
+        if "data" in frame:
+            return frame["data"]
+
+        raise StopAsyncIteration
+
+    async def _start(self):
+        self._connection = await self.client._get_connection()
+
+        payload = {
+            "endpoint": self.endpoint,
+            "data": self.data,
+            "stream": self.window,
+        }
+
+        if self._connection.legacy:
+            # Servers from before the handshake can't stream, so the whole
+            # response is the only item.
+            self._feed({"data": await self._connection.request(payload)})
+            return
+
+        self._nonce = await self._connection.open_stream(self, payload)
+        self._finalizer = weakref.finalize(self, _abandoned, self._connection, self._nonce)
+
+    def _feed(self, frame):
+        self._queue.put_nowait(frame)
+
+    async def _finish(self, cancel=False):
+        self._done = True
+
+        if self._finalizer is not None:
+            self._finalizer.detach()
+
+        if self._connection is not None:
+            await self._connection.close_stream(self._nonce, cancel=cancel)
+
+    async def aclose(self):
+        """Stops the stream early, telling the server to stop sending it."""
+        if not self._done:
+            await self._finish(cancel=self._connection is not None)
+
+
+class IpcSubscription:
+    """An asynchronous iterator over the data of an event published by the server.
+
+    Returned by :meth:`Client.subscription`. The client subscribes to the event
+    when iteration starts, and unsubscribes when :meth:`aclose` is called.
+    """
+
+    def __init__(self, client, event):
+        self.client = client
+        self.event = event
+
+        self._queue = asyncio.Queue()
+        self._subscribed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self._subscribed:
+            self._subscribed = True
+            await self.client.subscribe(self.event, self._queue.put_nowait)
+
+        return await self._queue.get()
+
+    async def aclose(self):
+        """Unsubscribes from the event."""
+        if self._subscribed:
+            self._subscribed = False
+            await self.client.unsubscribe(self.event, self._queue.put_nowait)
+
+
 class Client:
     """
     Handles webserver side requests to the bot process.
@@ -18,11 +463,93 @@ class Client:
         The IP or host of the IPC server, defaults to localhost
     port: int
         The port of the IPC server. If not supplied the port will be found automatically, defaults to None
+    path: str
+        The path of the Unix domain socket of the IPC server, for a server on the same host.
+        Takes precedence over ``host`` and ``port``, defaults to None
     secret_key: Union[str, bytes]
         The secret key for your IPC server. Must match the server secret_key or requests will not go ahead, defaults to None
+    pool_size: int
+        The number of websocket connections to open to the server. Requests are sent over the
+        connection with the fewest requests in flight, defaults to 1
+    serializers: List[str]
+        The wire formats to offer the server, in order of preference. ``"orjson"`` and
+        ``"msgpack"`` are used when installed and the server supports them, otherwise
+        JSON is used, defaults to ``["json"]``
+    cache: :class:`~discord.ext.ipc.cache.ResponseCache`
+        Caches responses of the endpoints it has a TTL for. The server can invalidate
+        cached responses with :meth:`~discord.ext.ipc.server.Server.invalidate`, defaults to None
+    stream_window: int
+        The number of chunks the server may send ahead of what a :meth:`stream` has
+        consumed, defaults to 32
+    metrics: Union[bool, :class:`~discord.ext.ipc.metrics.Metrics`]
+        Record per-endpoint request counts, latencies, payload sizes, errors and
+        reconnections, read with :meth:`stats`, defaults to False
+    tracer
+        An OpenTelemetry-style tracer. Each request is wrapped in a span started with
+        ``tracer.start_as_current_span``, defaults to None
+    reconnect_delay: float
+        How long, in seconds, to wait before the first attempt to reconnect after every
+        connection was lost. The delay doubles, with jitter, after each failed attempt,
+        defaults to 0.5
+    max_reconnect_delay: float
+        The longest delay between two attempts to reconnect, defaults to 30
+    reconnect_timeout: float
+        How long, in seconds, a request waits for the client to reconnect before raising
+        :class:`~discord.ext.ipc.errors.NotConnected`. If not supplied requests wait until
+        the server is back, defaults to None
+    replay_in_flight: bool
+        Whether requests which were already sent when their connection was lost are sent
+        again once the client reconnects. The server may have run them already, so only
+        enable this if every route can safely run twice. Otherwise they raise
+        :class:`~discord.ext.ipc.errors.NotConnected`, defaults to False
+    max_pending: int
+        The number of requests which may wait for the client to reconnect. Requests made
+        while that many are already waiting raise :class:`~discord.ext.ipc.errors.NotConnected`
+        straight away, defaults to 1000
+    timeout: float
+        How long, in seconds, requests wait for a response before raising
+        :class:`~discord.ext.ipc.errors.RequestTimeout`, unless they are given their own
+        ``request_timeout``. If not supplied requests wait until they are responded to, defaults to None
+    compression_threshold: int
+        Compress requests of at least this many bytes with zlib before sending them, if the
+        server supports it. The server compresses its responses according to its own
+        settings, defaults to None, for no compression
+    compression_level: int
+        The zlib compression level, from 1 (fastest) to 9 (smallest), defaults to 6
+    registry_refresh: float
+        How often, in seconds, :attr:`servers` is refreshed from the multicast server in the
+        background when no port was supplied, defaults to 60
+
+    Attributes
+    ----------
+    servers: List[dict]
+        The servers registered with the multicast server, as of the last refresh. See
+        :meth:`~discord.ext.ipc.registry.Registry.servers`.
     """
 
-    def __init__(self, host="localhost", port=None, multicast_port=20000, secret_key=None):
+    def __init__(
+        self,
+        host="localhost",
+        port=None,
+        path=None,
+        multicast_port=20000,
+        secret_key=None,
+        pool_size=1,
+        serializers=("json",),
+        cache=None,
+        stream_window=32,
+        metrics=False,
+        tracer=None,
+        reconnect_delay=0.5,
+        max_reconnect_delay=30.0,
+        reconnect_timeout=None,
+        replay_in_flight=False,
+        max_pending=1000,
+        timeout=None,
+        compression_threshold=None,
+        compression_level=6,
+        registry_refresh=60.0,
+    ):
         """Constructor"""
         self.loop = asyncio.get_event_loop()
 
@@ -30,18 +557,72 @@ class Client:
 
         self.host = host
         self.port = port
+        self.path = path
 
         self.session = None
 
-        self.websocket = None
         self.multicast = None
 
         self.multicast_port = multicast_port
 
+        self.registry_refresh = registry_refresh
+        self.servers = []
+
+        self.pool_size = pool_size
+        self.connections = []
+
+        self.serializers = resolve_serializers(serializers)
+
+        self.cache = cache
+
+        self.stream_window = stream_window
+
+        if metrics is True:
+            metrics = Metrics(namespace="discord_ipc_client")
+
+        self.metrics = metrics or None
+        self.tracer = tracer
+
+        self._subscribers = {}
+        self._subscriber = None
+
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.reconnect_timeout = reconnect_timeout
+        self.replay_in_flight = replay_in_flight
+        self.max_pending = max_pending
+
+        self.timeout = timeout
+
+        self.compression = None
+
+        if compression_threshold is not None:
+            self.compression = Compression(compression_threshold, compression_level)
+
+        # Requests waiting for a connection, woken in order once one is back.
+        self._replay = collections.deque()
+        self._reconnect_task = None
+        self._refresh_task = None
+        self._closing = False
+
+        self._nonce = itertools.count()
+        self._connect_lock = asyncio.Lock()
+
     @property
     def url(self):
+        if self.path:
+            # The host is only used for the Host header over a Unix socket.
+            return "ws://localhost"
+
         return "ws://{0.host}:{1}".format(self, self.port if self.port else self.multicast_port)
 
+    @property
+    def websocket(self):
+        """Optional[:class:`~aiohttp.ClientWebSocketResponse`]: The websocket of the first open connection."""
+        for connection in self.connections:
+            if not connection.closed:
+                return connection.websocket
+
     async def init_sock(self):
         """Attempts to connect to the server
 
@@ -51,9 +632,13 @@ class Client:
             The websocket connection to the server
         """
         log.info("Initiating WebSocket connection.")
-        self.session = aiohttp.ClientSession()
 
-        if not self.port:
+        if self.path:
+            self.session = aiohttp.ClientSession(connector=aiohttp.UnixConnector(path=self.path))
+        else:
+            self.session = aiohttp.ClientSession()
+
+        if not self.port and not self.path:
             log.debug(
                 "No port was provided - initiating multicast connection at %s.",
                 self.url,
@@ -75,62 +660,647 @@ class Client:
                 raise NotConnected("Multicast server connection failed.")
 
             port_data = recv.json()
-            self.port = port_data["port"]
+            self.servers = port_data.get("servers") or []
+            multicast_session = self.session
 
-        self.websocket = await self.session.ws_connect(self.url, autoping=False, autoclose=False)
-        log.info("Client connected to %s", self.url)
+            if port_data.get("port") is not None:
+                self.port = port_data["port"]
+            elif port_data.get("path") is not None:
+                # The server only listens on a Unix socket, which needs a session of its own.
+                self.path = port_data["path"]
+                self.session = aiohttp.ClientSession(
+                    connector=aiohttp.UnixConnector(path=self.path)
+                )
+            else:
+                # Lets the next request ask the multicast server again.
+                self.session = None
+                await multicast_session.close()
+                raise NotConnected("Multicast server did not say where the IPC server listens.")
+
+            # The port or path is kept for reconnecting, so only the registry needs refreshing.
+            if self.registry_refresh:
+                self._refresh_task = self.loop.create_task(
+                    self._refresh_servers(self.session, multicast_session)
+                )
+            elif multicast_session is not self.session:
+                await multicast_session.close()
+
+        self.connections = []
+
+        for _ in range(self.pool_size):
+            await self._connect()
 
         return self.websocket
 
-    async def request(self, endpoint, **kwargs):
+    async def _connect(self):
+        """Opens a single connection and adds it to the pool."""
+        websocket = await self.session.ws_connect(
+            self.url,
+            autoping=False,
+            autoclose=False,
+            protocols=[serializer.protocol for serializer in self.serializers],
+        )
+        log.info("Client connected to %s", self.path or self.url)
+
+        try:
+            authenticated, compression, legacy = await self._authenticate(websocket)
+        except BaseException:
+            await websocket.close()
+            raise
+
+        connection = IpcConnection(self, websocket, authenticated, compression, legacy)
+        self.connections.append(connection)
+
+        # Subscriptions live on a single connection, so that each event is only
+        # received once. They move to a new connection if that one is lost.
+        if self._subscribers and (self._subscriber is None or self._subscriber.closed):
+            self._subscriber = connection
+            await self._update_subscriptions(subscribe=list(self._subscribers))
+
+        return connection
+
+    async def _authenticate(self, websocket):
+        """Proves to the server that the client has the secret key, by signing a challenge,
+        and agrees on whether payloads may be compressed.
+
+        Returns
+        -------
+        Tuple[bool, Optional[:class:`~discord.ext.ipc.compression.Compression`], bool]
+            Whether the connection is authenticated, how to compress requests on it and
+            whether the server predates the handshake. Servers which don't support the
+            handshake, or refused it, get the secret key with every request instead.
+        """
+        serializer = negotiated_serializer(websocket.protocol)
+
+        async def receive():
+            recv = await websocket.receive()
+
+            if recv.type not in (aiohttp.WSMsgType.TEXT, aiohttp.WSMsgType.BINARY):
+                raise NotConnected("WebSocket connection closed during authentication.")
+
+            return serializer.loads(decompress(recv.data))
+
+        await serializer.send(websocket, {"hello": True, "compression": ALGORITHMS})
+        response = await receive()
+
+        if not isinstance(response, dict) or "challenge" not in response:
+            log.info(
+                "IPC server does not support the handshake, sending requests one at a time: %r",
+                response,
+            )
+            return False, None, True
+
+        compression = None
+
+        if "zlib" in (response.get("compression") or ()):
+            compression = self.compression
+
+        await serializer.send(websocket, {"auth": sign(self.secret_key, response["challenge"])})
+        response = await receive()
+
+        if not response.get("authenticated"):
+            log.error("Server refused to authenticate the connection: %s", response.get("error"))
+            return False, compression, False
+
+        return True, compression, False
+
+    async def _update_subscriptions(self, subscribe=(), unsubscribe=()):
+        if self._subscriber is None or self._subscriber.closed:
+            connection = await self._get_connection()
+
+            # Connecting sends every subscription on the new subscriber.
+            if self._subscriber is not None and not self._subscriber.closed:
+                return
+
+            self._subscriber = connection
+            subscribe, unsubscribe = list(self._subscribers), ()
+
+        payload = {"subscribe": list(subscribe), "unsubscribe": list(unsubscribe)}
+
+        response = await self._subscriber.request(payload)
+
+        if isinstance(response, dict) and "error" in response:
+            log.error("Failed to update subscriptions: %s", response["error"])
+
+    async def subscribe(self, event, callback):
+        """Subscribe to an event published by the server with
+        :meth:`~discord.ext.ipc.server.Server.publish`.
+
+        Parameters
+        ----------
+        event: str
+            The name of the event
+        callback: Callable[[Any], Any]
+            Called with the data of each event. Coroutine functions are run as tasks.
+        """
+        callbacks = self._subscribers.setdefault(event, [])
+        callbacks.append(callback)
+
+        if len(callbacks) == 1:
+            await self._update_subscriptions(subscribe=[event])
+
+    async def unsubscribe(self, event, callback=None):
+        """Unsubscribe from an event.
+
+        Parameters
+        ----------
+        event: str
+            The name of the event
+        callback: Callable[[Any], Any]
+            The callback to remove. If not supplied every callback of the event is removed
+        """
+        callbacks = self._subscribers.get(event, [])
+
+        if callback is not None and callback in callbacks:
+            callbacks.remove(callback)
+        elif callback is None:
+            callbacks.clear()
+
+        if not callbacks and self._subscribers.pop(event, None) is not None:
+            await self._update_subscriptions(unsubscribe=[event])
+
+    def subscription(self, event):
+        """Iterate over the data of an event published by the server.
+
+        .. code-block:: python
+
+            async for member in ipc_client.subscription("member_join"):
+                ...
+
+        Parameters
+        ----------
+        event: str
+            The name of the event
+
+        Returns
+        -------
+        :class:`IpcSubscription`
+            An asynchronous iterator over the data of each event
+        """
+        return IpcSubscription(self, event)
+
+    def _handle_event(self, message):
+        """Called by a connection when the server publishes an event."""
+        for callback in list(self._subscribers.get(message["event"], ())):
+            try:
+                result = callback(message.get("data"))
+            except Exception:
+                log.exception("Callback for event %r raised an error", message["event"])
+                continue
+
+            if asyncio.iscoroutine(result):
+                self.loop.create_task(result)
+
+    def _handle_invalidate(self, message):
+        """Called by a connection when the server invalidates cached responses."""
+        log.debug("Server invalidated %r with %r", message["invalidate"], message.get("data"))
+
+        if self.cache is not None:
+            self.cache.invalidate(message["invalidate"], message.get("data"))
+
+    async def _refresh_servers(self, session, multicast_session=None):
+        """Keeps :attr:`servers` up to date over the multicast connection.
+
+        Runs for as long as ``session`` is the client's session. The multicast
+        server is reached through ``multicast_session`` if given, which is
+        closed once the refresh stops.
+        """
+        url = "ws://{0.host}:{0.multicast_port}".format(self)
+        payload = {"servers": True, "headers": {"Authorization": self.secret_key}}
+
+        if multicast_session is None:
+            multicast_session = session
+
+        try:
+            while self.session is session and not session.closed:
+                await asyncio.sleep(self.registry_refresh)
+
+                try:
+                    if self.multicast is None or self.multicast.closed:
+                        self.multicast = await multicast_session.ws_connect(url, autoping=False)
+
+                    await self.multicast.send_json(payload)
+                    recv = await self.multicast.receive()
+                except (aiohttp.ClientError, OSError, RuntimeError) as error:
+                    log.debug("Failed to refresh the IPC server registry (%s)", error)
+                    continue
+
+                if recv.type != aiohttp.WSMsgType.TEXT:
+                    self.multicast = None
+                    continue
+
+                response = recv.json()
+
+                if "servers" in response:
+                    self.servers = response["servers"]
+                    log.debug("Refreshed the IPC server registry: %r", self.servers)
+        finally:
+            if multicast_session is not session:
+                await multicast_session.close()
+
+    def _connection_lost(self, connection):
+        """Called by a connection once its websocket has closed."""
+        if connection in self.connections:
+            self.connections.remove(connection)
+
+        if self.session and not self.session.closed:
+            self._start_reconnect()
+
+    def _start_reconnect(self):
+        """Starts the shared reconnect task, unless it is already running."""
+        if self._reconnect_task is None or self._reconnect_task.done():
+            self._reconnect_task = self.loop.create_task(self._reconnect())
+
+    def _backoff(self, attempt):
+        """Returns how long to wait before another attempt to reconnect."""
+        delay = min(self.max_reconnect_delay, self.reconnect_delay * 2**attempt)
+
+        # Half of the delay is random, so clients of a restarting server don't all
+        # reconnect at the same moment.
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    async def _reconnect(self):
+        """Tops the pool back up, backing off between failed attempts."""
+        session = self.session
+        attempt = 0
+
+        try:
+            while self.session is session and not session.closed:
+                if sum(not connection.closed for connection in self.connections) >= self.pool_size:
+                    return
+
+                if self.metrics is not None:
+                    self.metrics.reconnects += 1
+
+                try:
+                    await self._connect()
+                except (aiohttp.ClientError, OSError, NotConnected) as error:
+                    delay = self._backoff(attempt)
+                    attempt += 1
+
+                    log.warning(
+                        "Failed to reconnect to the IPC server (%s). Retrying in %.2f seconds.",
+                        error,
+                        delay,
+                    )
+
+                    await asyncio.sleep(delay)
+                else:
+                    self._release_replay()
+        finally:
+            if not any(not connection.closed for connection in self.connections):
+                self._release_replay(NotConnected("The IPC client was closed."))
+
+    def _release_replay(self, error=None):
+        """Wakes the requests waiting for a connection, in the order they were made."""
+        while self._replay:
+            future = self._replay.popleft()
+
+            if future.done():
+                continue
+
+            if error is None:
+                future.set_result(None)
+            else:
+                future.set_exception(error)
+
+    async def _wait_for_connection(self, deadline):
+        """Waits for the reconnect task to bring a connection back."""
+        if len(self._replay) >= self.max_pending:
+            raise NotConnected(
+                "IPC server is unreachable and {} requests are already waiting for it.".format(
+                    len(self._replay)
+                )
+            )
+
+        self._start_reconnect()
+
+        future = self.loop.create_future()
+        self._replay.append(future)
+
+        timeout = None if deadline is None else max(0, deadline - self.loop.time())
+
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            raise NotConnected("Timed out waiting to reconnect to the IPC server.") from None
+        finally:
+            if not future.done():
+                future.cancel()
+
+            try:
+                self._replay.remove(future)
+            except ValueError:
+                pass
+
+    async def _get_connection(self, deadline=None):
+        """Returns the open connection with the fewest requests in flight.
+
+        Parameters
+        ----------
+        deadline: float
+            The loop time after which to stop waiting for a lost connection to be
+            replaced, defaults to :attr:`reconnect_timeout` from now
+        """
+        # The session is set before its connections are open, so requests made
+        # while the first ones connect wait for them rather than reconnecting.
+        if self._closing:
+            raise NotConnected("The IPC client is closing.")
+
+        if not self.session or self._connect_lock.locked():
+            async with self._connect_lock:
+                if not self.session:
+                    await self.init_sock()
+
+        if deadline is None and self.reconnect_timeout is not None:
+            deadline = self.loop.time() + self.reconnect_timeout
+
+        while True:
+            connections = [connection for connection in self.connections if not connection.closed]
+
+            if connections:
+                return min(connections, key=lambda connection: connection.in_flight)
+
+            await self._wait_for_connection(deadline)
+
+    async def request(self, endpoint, request_timeout=None, **kwargs):
         """Make a request to the IPC server process.
 
+        Requests are tagged with a nonce which the server echoes back,
+        so this may be called concurrently on a single client.
+
         Parameters
         ----------
         endpoint: str
             The endpoint to request on the server
+        request_timeout: float
+            How long, in seconds, to wait for the response. The server stops
+            running the route once it is up, defaults to :attr:`timeout`.
+            Named apart from ``timeout`` so that routes can still take a
+            ``timeout`` of their own
         **kwargs
             The data to send to the endpoint
+
+        Raises
+        ------
+        RequestTimeout
+            The server did not respond in time.
         """
         log.info("Requesting IPC Server for %r with %r", endpoint, kwargs)
-        if not self.session:
-            await self.init_sock()
 
-        payload = {
-            "endpoint": endpoint,
-            "data": kwargs,
-            "headers": {"Authorization": self.secret_key},
-        }
+        if self.cache is not None:
+            return await self.cache.fetch(
+                endpoint,
+                kwargs,
+                functools.partial(self._request, endpoint, kwargs, request_timeout),
+            )
 
-        await self.websocket.send_json(payload)
+        return await self._request(endpoint, kwargs, request_timeout)
 
-        log.debug("Client > %r", payload)
+    async def _request(self, endpoint, kwargs, timeout=None):
+        return await self._send({"endpoint": endpoint, "data": kwargs}, timeout)
 
-        recv = await self.websocket.receive()
+    async def batch(self, requests, request_timeout=None):
+        """Make several requests to the IPC server process in a single message.
 
-        log.debug("Client < %r", recv)
+        The server runs every request in the batch concurrently and sends back
+        all of their responses at once. Responses cached by :attr:`cache` are
+        returned without being sent.
 
-        if recv.type == aiohttp.WSMsgType.PING:
-            log.info("Received request to PING")
-            await self.websocket.ping()
+        Parameters
+        ----------
+        requests: Iterable[Tuple[str, dict]]
+            Pairs of the endpoint to request and the data to send to it
+        request_timeout: float
+            How long, in seconds, to wait for every response, defaults to :attr:`timeout`
 
-            return await self.request(endpoint, **kwargs)
+        Returns
+        -------
+        list
+            The response of each request, in the order they were given
+        """
+        requests = [(endpoint, dict(data or {})) for endpoint, data in requests]
+        log.info("Requesting IPC Server for a batch of %d requests", len(requests))
 
-        if recv.type == aiohttp.WSMsgType.PONG:
-            log.info("Received PONG")
-            return await self.request(endpoint, **kwargs)
+        responses = [None] * len(requests)
+        missing = []
 
-        if recv.type == aiohttp.WSMsgType.CLOSED:
-            log.error(
-                "WebSocket connection unexpectedly closed. IPC Server is unreachable. Attempting reconnection in 5 seconds."
-            )
+        for index, (endpoint, data) in enumerate(requests):
+            if self.cache is not None and self.cache.ttl_for(endpoint) is not None:
+                hit, value = self.cache.get(self.cache.key(endpoint, data))
+
+                if hit:
+                    responses[index] = value
+                    continue
+
+            missing.append(index)
+
+        if not missing:
+            return responses
+
+        batch = [{"endpoint": requests[index][0], "data": requests[index][1]} for index in missing]
+        received = await self._send({"batch": batch}, request_timeout)
+
+        if not isinstance(received, list):
+            # The whole batch was rejected, e.g. for an invalid secret key.
+            received = [received] * len(missing)
+
+        for index, response in zip(missing, received):
+            responses[index] = response
+
+            endpoint, data = requests[index]
+            ttl = self.cache.ttl_for(endpoint) if self.cache is not None else None
+
+            if ttl is not None and not (
+                isinstance(response, dict) and "error" in response and "code" in response
+            ):
+                self.cache.set(self.cache.key(endpoint, data), response, ttl)
+
+        return responses
+
+    def stream(self, endpoint, **kwargs):
+        """Stream the response of an endpoint from the IPC server process.
+
+        Routes written as async generators send their items as they are
+        produced, and are only sent ahead of what has been consumed by up to
+        :attr:`stream_window` items.
+
+        Streams left before their last item should be closed, which tells the
+        server to stop sending them:
+
+        .. code-block:: python
+
+            async with ipc_client.stream("get_members", guild_id=12345678) as members:
+                async for member in members:
+                    if member["name"] == name:
+                        break
+
+        Parameters
+        ----------
+        endpoint: str
+            The endpoint to request on the server
+        **kwargs
+            The data to send to the endpoint
+
+        Returns
+        -------
+        :class:`IpcStream`
+            An asynchronous iterator over the items of the response
+        """
+        log.info("Streaming IPC Server for %r with %r", endpoint, kwargs)
+
+        return IpcStream(self, endpoint, kwargs, self.stream_window)
+
+    async def info(self):
+        """Fetch what the IPC server process tells clients about itself.
+
+        Returns
+        -------
+        dict
+            The ``endpoints`` of the server, the ``schemas`` of the routes which have one,
+            and the ``shard_ids`` and ``shard_count`` of the bot
+        """
+        return await self._send({"info": True})
+
+    async def schemas(self):
+        """Fetch the schemas of the routes on the IPC server process which have one.
+
+        Returns
+        -------
+        Dict[str, Dict[str, dict]]
+            Each endpoint mapped to its fields, each with the ``type`` it must have,
+            whether it is ``required`` and whether it is ``nullable``
+        """
+        info = await self.info()
+
+        if isinstance(info, dict) and "schemas" in info:
+            return info["schemas"]
+
+        return info
+
+    def stats(self):
+        """Returns the metrics recorded by the client.
+
+        Returns
+        -------
+        Optional[dict]
+            See :meth:`~discord.ext.ipc.metrics.Metrics.stats`, or None if the
+            client was not created with ``metrics`` enabled
+        """
+        if self.metrics is None:
+            return None
+
+        return self.metrics.stats()
+
+    async def close(self, timeout=10.0):
+        """Closes the connections to the server.
+
+        Requests made while the client closes raise
+        :class:`~discord.ext.ipc.errors.NotConnected`, and the requests already
+        sent are given ``timeout`` seconds to be responded to before the
+        connections are closed. The client connects again if it is used
+        afterwards.
+
+        Parameters
+        ----------
+        timeout: float
+            How long, in seconds, to wait for requests in flight to be
+            responded to, defaults to 10
+        """
+        session = self.session
+
+        if session is None or self._closing:
+            return
+
+        self._closing = True
+
+        try:
+            pending = [
+                future for connection in self.connections for future in connection._pending.values()
+            ]
+
+            if pending:
+                await asyncio.wait(pending, timeout=timeout)
+
+            # Stops the background tasks, and connections from being replaced.
+            self.session = None
+
+            for task in (self._reconnect_task, self._refresh_task):
+                if task is not None:
+                    task.cancel()
+
+            self._release_replay(NotConnected("The IPC client was closed."))
+
+            connections, self.connections = self.connections, []
+
+            for connection in connections:
+                await connection.close()
+
+            if self.multicast is not None:
+                await self.multicast.close()
+
+            await session.close()
+        finally:
+            self.multicast = None
+            self._subscriber = None
+            self._reconnect_task = None
+            self._refresh_task = None
+            self._closing = False
+
+        log.info("IPC client closed.")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def _send(self, payload, timeout=None):
+        """Sends a payload over the least busy connection, reconnecting if needed."""
+        if self.tracer is None:
+            return await self._send_untraced(payload, timeout)
+
+        endpoint = request_label(payload)
+
+        with self.tracer.start_as_current_span(
+            "ipc.request {}".format(endpoint), attributes={"ipc.endpoint": endpoint}
+        ) as span:
+            response = await self._send_untraced(payload, timeout)
+            span.set_attribute("ipc.code", response_code(response))
+
+            return response
+
+    async def _send_untraced(self, payload, timeout=None):
+        if timeout is None:
+            timeout = self.timeout
+
+        now = self.loop.time()
+        deadline = None if timeout is None else now + timeout
+        reconnect_deadline = deadline
 
-            await self.session.close()
+        if self.reconnect_timeout is not None:
+            reconnect_deadline = min(now + self.reconnect_timeout, deadline or float("inf"))
 
-            await asyncio.sleep(5)
+        while True:
+            connection = await self._get_connection(reconnect_deadline)
 
-            await self.init_sock()
+            try:
+                return await connection.request(payload, deadline)
+            except ConnectionResetError:
+                # The request never reached the server; send it once another connection is open.
+                log.debug("Connection lost, replaying unsent request %r", payload.get("nonce"))
 
-            return await self.request(endpoint, **kwargs)
+                # Sending can fail before the reader sees the connection drop,
+                # which would otherwise hand the same connection straight back.
+                connection.abort()
+            except NotConnected:
+                # The server may already have run the request, so it is only
+                # sent again when running it twice was allowed.
+                if not self.replay_in_flight:
+                    raise NotConnected(
+                        "Connection lost while waiting for the response to request {}.".format(
+                            payload.get("nonce")
+                        )
+                    ) from None
 
-        return recv.json()
+                log.debug("Connection lost, replaying request %r", payload.get("nonce"))
@@ -0,0 +1,242 @@
+import asyncio
+import logging
+
+from discord.ext.ipc.client import Client
+from discord.ext.ipc.errors import *
+from discord.ext.ipc.registry import fetch_servers
+
+log = logging.getLogger(__name__)
+
+_LOCAL_HOSTS = ("localhost", "127.0.0.1", "::1", "0.0.0.0", "::")
+
+
+def _is_error(response):
+    return isinstance(response, dict) and "error" in response and "code" in response
+
+
+class ClusterClient:
+    """
+    Handles webserver side requests to a bot split over several processes,
+    each running its own :class:`~discord.ext.ipc.server.Server`.
+
+    Requests with a ``guild_id`` are sent to the process running that guild's shard.
+
+    Parameters
+    ----------
+    clusters: List[dict]
+        The ``host`` and ``port``, or Unix socket ``path``, and the ``shard_ids`` of each bot process. If ``shard_ids``
+        is not supplied it is asked from the process on the first request
+    shard_count: int
+        The total number of shards. If not supplied it is asked from the processes, defaults to None
+    secret_key: Union[str, bytes]
+        The secret key of the IPC servers, defaults to None
+    **options
+        Passed to the :class:`~discord.ext.ipc.client.Client` of each process
+    """
+
+    def __init__(self, clusters, shard_count=None, secret_key=None, **options):
+        self.shard_count = shard_count
+        self.clients = []
+
+        self._shard_ids = []
+        self._shards = {}
+        self._discover_lock = asyncio.Lock()
+
+        for cluster in clusters:
+            client = Client(
+                host=cluster.get("host", "localhost"),
+                port=cluster.get("port"),
+                path=cluster.get("path"),
+                secret_key=secret_key,
+                **options
+            )
+            self.clients.append(client)
+
+            shard_ids = cluster.get("shard_ids")
+            self._shard_ids.append(list(shard_ids) if shard_ids is not None else None)
+
+            for shard_id in shard_ids or ():
+                self._shards[shard_id] = client
+
+    @classmethod
+    async def from_registry(
+        cls, host="localhost", multicast_port=20000, secret_key=None, **options
+    ):
+        """Creates a cluster client for every server registered with a multicast server.
+
+        Parameters
+        ----------
+        host: str
+            The IP or host of the multicast server, defaults to localhost
+        multicast_port: int
+            The port of the multicast server, defaults to 20000
+        secret_key: Union[str, bytes]
+            The secret key of the IPC servers, defaults to None
+        **options
+            Passed to :class:`ClusterClient`
+
+        Returns
+        -------
+        :class:`ClusterClient`
+        """
+        servers = await fetch_servers(host, multicast_port, secret_key)
+
+        clusters = []
+        shard_count = options.pop("shard_count", None)
+
+        for server in servers:
+            # Servers listen on an address of the multicast server's host.
+            local = server["host"] in _LOCAL_HOSTS
+
+            clusters.append(
+                {
+                    "host": host if local else server["host"],
+                    "port": server["port"],
+                    "path": server["path"] if local and host in _LOCAL_HOSTS else None,
+                    "shard_ids": server["shard_ids"],
+                }
+            )
+
+            if shard_count is None:
+                shard_count = server["shard_count"]
+
+        return cls(clusters, shard_count=shard_count, secret_key=secret_key, **options)
+
+    def shard_id(self, guild_id):
+        """Returns the shard a guild belongs to.
+
+        Parameters
+        ----------
+        guild_id: int
+            The ID of the guild
+        """
+        return (int(guild_id) >> 22) % self.shard_count
+
+    async def discover(self):
+        """Asks every process whose shards are not known yet which shards it runs."""
+        async with self._discover_lock:
+            missing = [
+                index
+                for index, shard_ids in enumerate(self._shard_ids)
+                if shard_ids is None or self.shard_count is None
+            ]
+
+            if not missing:
+                return
+
+            responses = await asyncio.gather(*(self.clients[index].info() for index in missing))
+
+            for index, info in zip(missing, responses):
+                if _is_error(info):
+                    raise ServerConnectionRefusedError(info["error"])
+
+                if self.shard_count is None:
+                    self.shard_count = info["shard_count"] or 1
+
+                if self._shard_ids[index] is None:
+                    self._shard_ids[index] = info["shard_ids"] or [0]
+
+                    for shard_id in self._shard_ids[index]:
+                        self._shards[shard_id] = self.clients[index]
+
+                log.debug("Cluster %d runs shards %r", index, self._shard_ids[index])
+
+    async def client_for(self, guild_id):
+        """Returns the client of the process running a guild.
+
+        Parameters
+        ----------
+        guild_id: int
+            The ID of the guild
+
+        Returns
+        -------
+        :class:`~discord.ext.ipc.client.Client`
+        """
+        await self.discover()
+
+        shard_id = self.shard_id(guild_id)
+
+        try:
+            return self._shards[shard_id]
+        except KeyError:
+            raise NoEndpointFoundError(
+                "No cluster runs shard {} of guild {}".format(shard_id, guild_id)
+            ) from None
+
+    async def request(self, endpoint, **kwargs):
+        """Make a request to a single bot process.
+
+        Requests with a ``guild_id`` go to the process running that guild,
+        others go to the least busy process.
+
+        Parameters
+        ----------
+        endpoint: str
+            The endpoint to request on the server
+        **kwargs
+            The data to send to the endpoint
+        """
+        if kwargs.get("guild_id") is not None:
+            client = await self.client_for(kwargs["guild_id"])
+        else:
+            client = min(
+                self.clients,
+                key=lambda client: sum(connection.in_flight for connection in client.connections),
+            )
+
+        return await client.request(endpoint, **kwargs)
+
+    async def request_all(self, endpoint, merge=None, **kwargs):
+        """Make the same request to every bot process at once.
+
+        .. code-block:: python
+
+            guild_count = await ipc_client.request_all("get_guild_count", merge=sum)
+
+        Parameters
+        ----------
+        endpoint: str
+            The endpoint to request on the servers
+        merge: Callable[[list], Any]
+            Combines the responses of every process into one. If not supplied
+            the list of responses is returned, in the order of ``clusters``
+        **kwargs
+            The data to send to the endpoint
+
+        Returns
+        -------
+        Any
+            The merged responses, or the first error response if any process returned one
+        """
+        responses = await asyncio.gather(
+            *(client.request(endpoint, **kwargs) for client in self.clients)
+        )
+
+        if merge is None:
+            return list(responses)
+
+        for response in responses:
+            if _is_error(response):
+                return response
+
+        return merge(responses)
+
+    async def close(self, timeout=10.0):
+        """Closes the connections to every bot process.
+
+        See :meth:`~discord.ext.ipc.client.Client.close`.
+
+        Parameters
+        ----------
+        timeout: float
+            How long, in seconds, to wait for requests in flight to be
+            responded to, defaults to 10
+        """
+        await asyncio.gather(*(client.close(timeout) for client in self.clients))
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
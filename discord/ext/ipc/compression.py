@@ -0,0 +1,83 @@
+import zlib
+
+#: Starts every compressed payload. Serialized payloads are always maps, so
+#: never start with a null byte themselves.
+MARKER = b"\x00"
+
+#: The compression algorithms payloads can be received in.
+ALGORITHMS = ["zlib"]
+
+#: The largest size payloads are decompressed to, the same as the largest
+#: message aiohttp receives on a websocket by default.
+MAX_SIZE = 4 * 1024 * 1024
+
+
+class Compression:
+    """Compresses payloads above a size threshold with :mod:`zlib`.
+
+    Compressed payloads are sent as binary websocket frames starting with
+    :data:`MARKER`. Whether the other side can decompress them is agreed on
+    when the connection is authenticated.
+
+    Parameters
+    ----------
+    threshold: int
+        The size, in bytes, from which payloads are compressed.
+    level: int
+        The zlib compression level, from 1 (fastest) to 9 (smallest).
+    """
+
+    __slots__ = ("threshold", "level")
+
+    def __init__(self, threshold=16 * 1024, level=6):
+        self.threshold = threshold
+        self.level = level
+
+    def __repr__(self):
+        return "<Compression threshold={0.threshold} level={0.level}>".format(self)
+
+    def compress(self, data):
+        """Returns a serialized payload compressed, or None if it is below the
+        threshold or doesn't get any smaller."""
+        if len(data) < self.threshold:
+            return None
+
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+
+        compressed = MARKER + zlib.compress(data, self.level)
+
+        if len(compressed) >= len(data):
+            return None
+
+        return compressed
+
+
+def is_compressed(data):
+    """Whether a received payload was compressed."""
+    return isinstance(data, bytes) and data[:1] == MARKER
+
+
+def decompress(data, max_size=MAX_SIZE):
+    """Returns a received payload decompressed, if it was compressed.
+
+    Raises ValueError if it is invalid, or would decompress to more than
+    ``max_size`` bytes.
+    """
+    if not is_compressed(data):
+        return data
+
+    inflater = zlib.decompressobj()
+
+    try:
+        inflated = inflater.decompress(data[1:], max_size)
+    except zlib.error as error:
+        raise ValueError("Invalid compressed payload: {}".format(error)) from None
+
+    # Either the payload is truncated, or there was more left to inflate.
+    if not inflater.eof:
+        raise ValueError(
+            "Compressed payload is incomplete or larger than {} bytes".format(max_size)
+        )
+
+    return inflated
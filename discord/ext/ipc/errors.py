@@ -29,3 +29,23 @@ class NotConnected(IPCError):
     """Raised upon websocket not connected"""
 
     pass
+
+
+class ValidationError(IPCError):
+    """Raised upon request data not matching the schema of a route
+
+    Attributes
+    ----------
+    errors: Dict[str, str]
+        What is wrong with each invalid field
+    """
+
+    def __init__(self, message, errors=None):
+        super().__init__(message)
+        self.errors = errors or {}
+
+
+class RequestTimeout(IPCError):
+    """Raised upon a request not being responded to within its timeout"""
+
+    pass
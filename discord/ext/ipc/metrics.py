@@ -0,0 +1,241 @@
+import bisect
+import collections
+import time
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def request_label(payload):
+    """Returns the name requests are counted under: the endpoint, or the kind of message."""
+    endpoint = payload.get("endpoint")
+
+    if endpoint is not None:
+        return endpoint
+
+    for kind in ("batch", "info", "subscribe", "unsubscribe"):
+        if kind in payload:
+            return "<{}>".format(kind)
+
+    return "<unknown>"
+
+
+def response_code(response):
+    """Returns the code of an error response, or 200 for any other response."""
+    if isinstance(response, dict) and "error" in response and "code" in response:
+        return response["code"]
+
+    return 200
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogram:
+    """A latency histogram with fixed buckets, in seconds."""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Returns the upper bound of the bucket the ``q`` quantile falls in."""
+        if not self.count:
+            return None
+
+        rank = q * self.count
+        seen = 0
+
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+
+            if seen >= rank:
+                return bound
+
+        return float("inf")
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+        }
+
+
+class Metrics:
+    """Counts what goes through a :class:`~discord.ext.ipc.server.Server` or
+    :class:`~discord.ext.ipc.client.Client`, per endpoint.
+
+    Parameters
+    ----------
+    namespace: str
+        The prefix of the metric names in :meth:`prometheus`.
+    buckets: Tuple[float]
+        The upper bounds, in seconds, of the latency histogram buckets.
+    """
+
+    def __init__(self, namespace="discord_ipc", buckets=DEFAULT_BUCKETS):
+        self.namespace = namespace
+        self.buckets = tuple(buckets)
+
+        self.requests = collections.Counter()
+        self.errors = collections.Counter()
+        self.in_flight = collections.Counter()
+        self.bytes_received = collections.Counter()
+        self.bytes_sent = collections.Counter()
+        self.bytes_saved = collections.Counter()
+        self.latency = {}
+        self.reconnects = 0
+
+    def start(self, endpoint):
+        """Marks a request as in flight, returning the time it started."""
+        self.in_flight[endpoint] += 1
+        return time.perf_counter()
+
+    def finish(self, endpoint, started, code=200):
+        """Records a finished request."""
+        elapsed = time.perf_counter() - started
+
+        self.in_flight[endpoint] -= 1
+        self.requests[endpoint] += 1
+
+        histogram = self.latency.get(endpoint)
+
+        if histogram is None:
+            histogram = self.latency[endpoint] = Histogram(self.buckets)
+
+        histogram.observe(elapsed)
+
+        if code != 200:
+            self.errors[endpoint, code] += 1
+
+    def received(self, endpoint, size):
+        self.bytes_received[endpoint] += size
+
+    def sent(self, endpoint, size, saved=0):
+        self.bytes_sent[endpoint] += size
+
+        if saved:
+            self.bytes_saved[endpoint] += saved
+
+    def stats(self):
+        """Returns every metric as a dictionary.
+
+        Returns
+        -------
+        dict
+            ``endpoints`` mapped to the ``requests``, ``in_flight``, ``latency``,
+            ``bytes_received``, ``bytes_sent``, ``bytes_saved`` by compression
+            and ``errors`` by code of each endpoint, and the number of ``reconnects``.
+        """
+        endpoints = {}
+
+        for endpoint in set(self.requests) | set(self.in_flight) | set(self.bytes_received):
+            endpoints[endpoint] = {
+                "requests": self.requests[endpoint],
+                "in_flight": self.in_flight[endpoint],
+                "latency": self.latency[endpoint].to_dict() if endpoint in self.latency else None,
+                "bytes_received": self.bytes_received[endpoint],
+                "bytes_sent": self.bytes_sent[endpoint],
+                "bytes_saved": self.bytes_saved[endpoint],
+                "errors": {
+                    str(code): count
+                    for (name, code), count in self.errors.items()
+                    if name == endpoint
+                },
+            }
+
+        return {"endpoints": endpoints, "reconnects": self.reconnects}
+
+    def prometheus(self):
+        """Returns every metric in the Prometheus text exposition format."""
+        ns = self.namespace
+        lines = []
+
+        def family(name, kind, help_text, samples):
+            lines.append("# HELP {}_{} {}".format(ns, name, help_text))
+            lines.append("# TYPE {}_{} {}".format(ns, name, kind))
+
+            for suffix, labels, value in samples:
+                label_text = ",".join('{}="{}"'.format(key, _escape(val)) for key, val in labels)
+                lines.append(
+                    "{}_{}{}{} {}".format(
+                        ns, name, suffix, "{" + label_text + "}" if label_text else "", value
+                    )
+                )
+
+        family(
+            "requests_total",
+            "counter",
+            "Requests handled, by endpoint.",
+            [("", [("endpoint", endpoint)], count) for endpoint, count in self.requests.items()],
+        )
+        family(
+            "errors_total",
+            "counter",
+            "Error responses, by endpoint and code.",
+            [
+                ("", [("endpoint", endpoint), ("code", code)], count)
+                for (endpoint, code), count in self.errors.items()
+            ],
+        )
+        family(
+            "in_flight",
+            "gauge",
+            "Requests currently in flight, by endpoint.",
+            [("", [("endpoint", endpoint)], count) for endpoint, count in self.in_flight.items()],
+        )
+        family(
+            "received_bytes_total",
+            "counter",
+            "Payload bytes received, by endpoint.",
+            [
+                ("", [("endpoint", endpoint)], size)
+                for endpoint, size in self.bytes_received.items()
+            ],
+        )
+        family(
+            "sent_bytes_total",
+            "counter",
+            "Payload bytes sent, by endpoint.",
+            [("", [("endpoint", endpoint)], size) for endpoint, size in self.bytes_sent.items()],
+        )
+        family(
+            "saved_bytes_total",
+            "counter",
+            "Payload bytes saved by compression, by endpoint.",
+            [("", [("endpoint", endpoint)], size) for endpoint, size in self.bytes_saved.items()],
+        )
+
+        samples = []
+
+        for endpoint, histogram in self.latency.items():
+            cumulative = 0
+
+            for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                samples.append(("_bucket", [("endpoint", endpoint), ("le", le)], cumulative))
+
+            samples.append(("_sum", [("endpoint", endpoint)], histogram.sum))
+            samples.append(("_count", [("endpoint", endpoint)], histogram.count))
+
+        family(
+            "request_duration_seconds",
+            "histogram",
+            "Time taken to handle requests, by endpoint.",
+            samples,
+        )
+        family("reconnects_total", "counter", "Reconnections made.", [("", [], self.reconnects)])
+
+        return "\n".join(lines) + "\n"
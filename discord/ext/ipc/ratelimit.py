@@ -0,0 +1,77 @@
+import time
+
+#: The priority classes routes can be given, mapped to the share of the
+#: server's ``max_in_flight`` requests they may fill before being shed.
+PRIORITIES = {"high": None, "normal": 1.0, "low": 0.5}
+
+
+class TokenBucket:
+    """Allows ``rate`` requests every ``per`` seconds, in bursts of up to ``rate``.
+
+    Parameters
+    ----------
+    rate: int
+        The number of requests allowed per window.
+    per: float
+        The length of the window in seconds.
+    """
+
+    __slots__ = ("rate", "per", "tokens", "updated")
+
+    def __init__(self, rate, per):
+        if rate <= 0 or per <= 0:
+            raise ValueError("Rate limits must allow a positive number of requests per second")
+
+        self.rate = rate
+        self.per = per
+        self.tokens = float(rate)
+        self.updated = time.monotonic()
+
+    def acquire(self, cost=1):
+        """Takes ``cost`` tokens from the bucket.
+
+        Returns
+        -------
+        float
+            0 if the tokens were taken, otherwise how many seconds to wait
+            before there are enough of them.
+        """
+        now = time.monotonic()
+
+        # Anything costing more than a full bucket goes through once the bucket is full.
+        cost = min(cost, self.rate)
+
+        self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate / self.per)
+        self.updated = now
+
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+
+        return (cost - self.tokens) * self.per / self.rate
+
+
+def check_priority(priority):
+    """Raises ValueError if ``priority`` is not one of :data:`PRIORITIES`."""
+    if priority not in PRIORITIES:
+        raise ValueError(
+            "Unknown priority {!r}, expected one of {}".format(priority, ", ".join(PRIORITIES))
+        )
+
+
+def bucket(rate_limit):
+    """Returns a :class:`TokenBucket` for a ``(rate, per)`` tuple, or None for no limit."""
+    if rate_limit is None:
+        return None
+
+    rate, per = rate_limit
+    return TokenBucket(rate, per)
+
+
+def rate_limited(retry_after):
+    """Returns the response to a request refused by a rate limit."""
+    return {
+        "error": "Rate limited, retry in {:.2f} seconds.".format(retry_after),
+        "code": 429,
+        "retry_after": retry_after,
+    }
@@ -0,0 +1,94 @@
+import logging
+import time
+
+import aiohttp
+from discord.ext.ipc.errors import *
+
+log = logging.getLogger(__name__)
+
+
+class Registry:
+    """The servers registered with a multicast server.
+
+    The server hosting the multicast server is always listed. Other servers
+    stay registered for as long as their registration websocket is open,
+    and are listed as unhealthy once they miss their heartbeats.
+
+    Parameters
+    ----------
+    server: :class:`~discord.ext.ipc.server.Server`
+        The server hosting the multicast server.
+    heartbeat_interval: float
+        How often, in seconds, registered servers send heartbeats.
+    """
+
+    def __init__(self, server, heartbeat_interval):
+        self.server = server
+        self.heartbeat_interval = heartbeat_interval
+
+        self._entries = {}
+
+    def __len__(self):
+        return len(self._entries) + 1
+
+    def register(self, key, entry):
+        """Adds or updates the entry of a server."""
+        self._entries[key] = (time.monotonic(), dict(entry))
+
+    def unregister(self, key):
+        """Removes the entry of a server."""
+        self._entries.pop(key, None)
+
+    def servers(self):
+        """Returns the entry of every registered server.
+
+        Returns
+        -------
+        List[dict]
+            The ``host``, ``port``, ``path``, ``shard_ids``, ``shard_count`` and
+            ``in_flight`` requests of each server, and whether it is ``healthy``.
+        """
+        # Three heartbeats may be missed before a server is reported unhealthy.
+        healthy_after = time.monotonic() - self.heartbeat_interval * 3
+
+        servers = [dict(self.server.registry_entry(), healthy=True)]
+
+        for last_seen, entry in self._entries.values():
+            servers.append(dict(entry, healthy=last_seen >= healthy_after))
+
+        return servers
+
+
+async def fetch_servers(host="localhost", multicast_port=20000, secret_key=None):
+    """Asks a multicast server for the servers registered with it.
+
+    Parameters
+    ----------
+    host: str
+        The IP or host of the multicast server, defaults to localhost
+    multicast_port: int
+        The port of the multicast server, defaults to 20000
+    secret_key: Union[str, bytes]
+        The secret key of the IPC servers, defaults to None
+
+    Returns
+    -------
+    List[dict]
+        See :meth:`Registry.servers`.
+    """
+    url = "ws://{}:{}".format(host, multicast_port)
+
+    async with aiohttp.ClientSession() as session:
+        async with session.ws_connect(url, autoping=False) as websocket:
+            await websocket.send_json({"servers": True, "headers": {"Authorization": secret_key}})
+            recv = await websocket.receive()
+
+    if recv.type != aiohttp.WSMsgType.TEXT:
+        raise NotConnected("Multicast server connection failed.")
+
+    response = recv.json()
+
+    if "servers" not in response:
+        raise ServerConnectionRefusedError(response.get("error", "Invalid multicast response."))
+
+    return response["servers"]
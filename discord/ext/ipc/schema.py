@@ -0,0 +1,211 @@
+import inspect
+import typing
+
+from discord.ext.ipc.errors import *
+
+MISSING = object()
+
+
+def _type_name(annotation):
+    return getattr(annotation, "__name__", repr(annotation))
+
+
+def _resolve(annotation):
+    """Returns the annotation to validate against, and whether None is also allowed."""
+    if annotation is inspect.Parameter.empty or annotation is typing.Any:
+        return object, False
+
+    origin = getattr(annotation, "__origin__", None)
+
+    if origin is typing.Union:
+        args = [arg for arg in annotation.__args__ if arg is not type(None)]
+        optional = len(args) < len(annotation.__args__)
+
+        if len(args) == 1:
+            return _resolve(args[0])[0], optional
+
+        return object, optional
+
+    # Parameterized generics such as List[int] are only checked against their origin.
+    if isinstance(origin, type):
+        return origin, False
+
+    if origin is not None or not callable(annotation):
+        return object, False
+
+    return annotation, False
+
+
+def coercer(annotation):
+    """Returns a function checking, and where unambiguous converting, a value to a type.
+
+    ``int`` and ``float`` accept numeric strings, ``int`` only accepts floats without
+    a fractional part, ``bool`` only accepts booleans, other types must match exactly
+    and any other callable is used as the converter.
+    """
+    if annotation is bool:
+
+        def coerce(value):
+            if isinstance(value, bool):
+                return value
+
+            raise TypeError("expected bool, got {}".format(type(value).__name__))
+
+    elif annotation in (int, float):
+
+        def coerce(value):
+            if isinstance(value, bool):
+                raise TypeError("expected {}, got bool".format(annotation.__name__))
+
+            if isinstance(value, annotation):
+                return value
+
+            # Truncating would quietly turn a mangled ID into a different one.
+            if annotation is int and isinstance(value, float) and not value.is_integer():
+                raise ValueError("expected int, got non-integral float {!r}".format(value))
+
+            if isinstance(value, (int, float, str)):
+                return annotation(value)
+
+            raise TypeError("expected {}, got {}".format(annotation.__name__, type(value).__name__))
+
+    elif isinstance(annotation, type):
+
+        def coerce(value):
+            if isinstance(value, annotation):
+                return value
+
+            raise TypeError("expected {}, got {}".format(annotation.__name__, type(value).__name__))
+
+    elif callable(annotation):
+        coerce = annotation
+
+    else:
+        raise TypeError("Cannot validate fields against {!r}".format(annotation))
+
+    return coerce
+
+
+def compile_schema(schema, allow_extra=True):
+    """Compiles a route schema into a function validating request data against it.
+
+    Parameters
+    ----------
+    schema: Dict[str, Any]
+        Field names mapped to the type their value must have, or to a
+        ``(type, default)`` tuple for optional fields.
+    allow_extra: bool
+        Whether fields not in the schema are allowed through.
+
+    Returns
+    -------
+    Callable[[dict], dict]
+        Validates and coerces request data in place, raising
+        :class:`~discord.ext.ipc.errors.ValidationError` on bad data.
+        Its ``schema`` attribute describes each field.
+    """
+    fields = []
+
+    for name, spec in schema.items():
+        if isinstance(spec, tuple):
+            annotation, default = spec
+        else:
+            annotation, default = spec, MISSING
+
+        annotation, optional = _resolve(annotation)
+        fields.append((name, coercer(annotation), default, optional, _type_name(annotation)))
+
+    names = frozenset(name for name, *_ in fields)
+
+    def validate(data):
+        errors = {}
+
+        for name, coerce, default, optional, type_name in fields:
+            value = data.get(name, MISSING)
+
+            if value is MISSING:
+                if default is MISSING:
+                    errors[name] = "is required"
+                else:
+                    data[name] = default
+
+                continue
+
+            if value is None and optional:
+                continue
+
+            try:
+                data[name] = coerce(value)
+            except (TypeError, ValueError) as error:
+                errors[name] = "must be {} ({})".format(type_name, error)
+
+        if not allow_extra:
+            for name in data.keys() - names:
+                errors[name] = "is not a field of this route"
+
+        if errors:
+            raise ValidationError(
+                "Invalid request data: {}".format(
+                    ", ".join("{} {}".format(name, error) for name, error in errors.items())
+                ),
+                errors,
+            )
+
+        return data
+
+    validate.schema = {
+        name: {"type": type_name, "required": default is MISSING, "nullable": optional}
+        for name, _, default, optional, type_name in fields
+    }
+
+    return validate
+
+
+def signature_schema(func, skip_self=False):
+    """Builds a schema from the parameters of a typed route.
+
+    Parameters
+    ----------
+    func: Callable
+        The route.
+    skip_self: bool
+        Whether the first parameter is the cog the route is bound to.
+
+    Returns
+    -------
+    Tuple[Dict[str, Any], bool]
+        The schema, and whether the route accepts extra fields through ``**kwargs``.
+    """
+    try:
+        hints = typing.get_type_hints(func)
+    except Exception:
+        hints = {}
+
+    parameters = list(inspect.signature(func).parameters.values())
+
+    if skip_self:
+        parameters = parameters[1:]
+
+    schema = {}
+    allow_extra = False
+
+    for parameter in parameters:
+        if parameter.kind == parameter.VAR_KEYWORD:
+            allow_extra = True
+            continue
+
+        if parameter.kind in (parameter.VAR_POSITIONAL, parameter.POSITIONAL_ONLY):
+            raise TypeError(
+                "Typed route {} cannot take positional-only parameter {!r}".format(
+                    func.__qualname__, parameter.name
+                )
+            )
+
+        annotation = hints.get(parameter.name, parameter.annotation)
+
+        if parameter.default is parameter.empty:
+            schema[parameter.name] = annotation
+        else:
+            schema[parameter.name] = (annotation, parameter.default)
+
+    return schema, allow_extra
@@ -0,0 +1,170 @@
+import json
+
+from discord.ext.ipc.errors import *
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+class Serializer:
+    """Base class for the wire formats supported by the IPC.
+
+    Both sides of a connection negotiate which serializer to use when the
+    websocket is opened, falling back to :class:`JSONSerializer`.
+
+    Attributes
+    ----------
+    name: str
+        The name of the serializer, used during negotiation.
+    binary: bool
+        Whether payloads are sent as binary websocket frames rather than text frames.
+    """
+
+    name = None
+    binary = False
+
+    @property
+    def protocol(self):
+        """str: The websocket subprotocol this serializer is negotiated with."""
+        return "ipc.{}".format(self.name)
+
+    def dumps(self, obj):
+        """Serializes an object for sending.
+
+        Raises
+        ------
+        JSONEncodeError
+            The object contains values this serializer does not support.
+        """
+        raise NotImplementedError
+
+    def loads(self, data):
+        """Deserializes a received payload."""
+        raise NotImplementedError
+
+    async def send(self, websocket, obj, compression=None):
+        """Serializes an object and sends it over a websocket in the right frame type.
+
+        Returns
+        -------
+        int
+            The length of the payload sent.
+        """
+        return await self.send_dumped(websocket, self.dumps(obj), compression)
+
+    async def send_dumped(self, websocket, data, compression=None):
+        """Sends a payload already serialized with :meth:`dumps` over a websocket.
+
+        Parameters
+        ----------
+        websocket
+            The websocket to send the payload over.
+        data: Union[str, bytes]
+            The serialized payload.
+        compression: :class:`~discord.ext.ipc.compression.Compression`
+            Compresses the payload if it is large enough, defaults to None
+
+        Returns
+        -------
+        int
+            The length of the payload sent, after compression.
+        """
+        if compression is not None:
+            compressed = compression.compress(data)
+
+            if compressed is not None:
+                await websocket.send_bytes(compressed)
+                return len(compressed)
+
+        if self.binary:
+            await websocket.send_bytes(data)
+        else:
+            await websocket.send_str(data)
+
+        return len(data)
+
+
+class JSONSerializer(Serializer):
+    """Serializes payloads with the standard library :mod:`json` module."""
+
+    name = "json"
+
+    def dumps(self, obj):
+        try:
+            return json.dumps(obj)
+        except (TypeError, ValueError) as error:
+            raise JSONEncodeError(str(error)) from error
+
+    def loads(self, data):
+        return json.loads(data)
+
+
+class OrjsonSerializer(Serializer):
+    """Serializes payloads with :mod:`orjson`. Requires ``orjson`` to be installed."""
+
+    name = "orjson"
+    binary = True
+
+    def dumps(self, obj):
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError as error:
+            raise JSONEncodeError(str(error)) from error
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+
+class MsgpackSerializer(Serializer):
+    """Serializes payloads with :mod:`msgpack`. Requires ``msgpack`` to be installed."""
+
+    name = "msgpack"
+    binary = True
+
+    def dumps(self, obj):
+        try:
+            return msgpack.packb(obj, use_bin_type=True)
+        except (TypeError, ValueError, OverflowError) as error:
+            raise JSONEncodeError(str(error)) from error
+
+    def loads(self, data):
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+
+SERIALIZERS = {JSONSerializer.name: JSONSerializer()}
+
+if orjson is not None:
+    SERIALIZERS[OrjsonSerializer.name] = OrjsonSerializer()
+
+if msgpack is not None:
+    SERIALIZERS[MsgpackSerializer.name] = MsgpackSerializer()
+
+
+def resolve_serializers(names):
+    """Returns the available serializers out of ``names``, in order.
+
+    JSON is always supported and is appended if it was not listed, so
+    negotiation can always fall back to it.
+    """
+    serializers = [SERIALIZERS[name] for name in names if name in SERIALIZERS]
+
+    if SERIALIZERS["json"] not in serializers:
+        serializers.append(SERIALIZERS["json"])
+
+    return serializers
+
+
+def negotiated_serializer(protocol):
+    """Returns the serializer for a negotiated websocket subprotocol."""
+    for serializer in SERIALIZERS.values():
+        if serializer.protocol == protocol:
+            return serializer
+
+    return SERIALIZERS["json"]
@@ -1,12 +1,71 @@
+import asyncio
+import functools
+import inspect
 import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 import aiohttp.web
+from discord.ext.ipc.auth import check_key, new_challenge, verify
+from discord.ext.ipc.cache import ResponseCache
+from discord.ext.ipc.compression import (
+    ALGORITHMS,
+    MAX_SIZE,
+    Compression,
+    decompress,
+    is_compressed,
+)
 from discord.ext.ipc.errors import *
+from discord.ext.ipc.metrics import Metrics, request_label, response_code
+from discord.ext.ipc.ratelimit import PRIORITIES, bucket, check_priority, rate_limited
+from discord.ext.ipc.registry import Registry
+from discord.ext.ipc.schema import compile_schema, signature_schema
+from discord.ext.ipc.serializers import negotiated_serializer, resolve_serializers
 
 log = logging.getLogger(__name__)
 
+EXECUTORS = ("thread", "process")
 
-def route(name=None):
+# asyncio.current_task was only added in Python 3.7.
+_current_task = getattr(asyncio, "current_task", None) or asyncio.Task.current_task
+
+
+def _check_executor(executor):
+    if executor is not None and executor not in EXECUTORS:
+        raise ValueError(
+            "Unknown executor {!r}, expected one of {}".format(executor, ", ".join(EXECUTORS))
+        )
+
+
+def _check_executor_route(func, executor):
+    """Raises TypeError if a route can't run in the pool it was given."""
+    if executor is None:
+        return
+
+    if inspect.iscoroutinefunction(func) or inspect.isasyncgenfunction(func):
+        raise TypeError(
+            "Route {} runs in the {} pool, so must be a regular function".format(
+                func.__qualname__, executor
+            )
+        )
+
+    if executor == "process" and _is_method(func):
+        raise TypeError(
+            "Route {} runs in the process pool, so can't be a cog method".format(func.__qualname__)
+        )
+
+    # The pool's workers are spawned, so they import the route by its module,
+    # and importing the script being run would run the script again.
+    if executor == "process" and func.__module__ == "__main__":
+        raise TypeError(
+            "Route {} runs in the process pool, so must be defined in a module other than"
+            " the script being run".format(func.__qualname__)
+        )
+
+
+def route(
+    name=None, cache_ttl=None, schema=None, rate_limit=None, priority="normal", executor=None
+):
     """
     Used to register a coroutine as an endpoint when you don't have
     access to an instance of :class:`.Server`
@@ -16,28 +75,125 @@ def route(name=None):
     name: str
         The endpoint name. If not provided the method name will be
         used.
+    cache_ttl: float
+        Memoize the route's responses by request data for this many
+        seconds. If not provided responses are not memoized.
+    schema: Dict[str, Any]
+        Field names mapped to the type their value must have, or to a
+        ``(type, default)`` tuple for optional fields. Requests which
+        don't match are rejected before the route is called.
+    rate_limit: Tuple[int, float]
+        Allow ``rate`` requests to the route every ``per`` seconds, from
+        all clients together. Requests over the limit get a 429 response.
+    priority: str
+        ``"high"``, ``"normal"`` or ``"low"``. See :meth:`.Server.route`.
+    executor: str
+        ``"thread"`` or ``"process"``, to run the route, which must then
+        be a regular function, in one of the server's pools. See
+        :meth:`.Server.route`.
     """
+    check_priority(priority)
+    _check_executor(executor)
 
     def decorator(func):
-        if not name:
-            Server.ROUTES[func.__name__] = func
-        else:
-            Server.ROUTES[name] = func
+        _check_executor_route(func, executor)
+
+        endpoint = name or func.__name__
+
+        Server.ROUTES[endpoint] = func
+        Server.ROUTE_OPTIONS[endpoint] = {
+            "cache_ttl": cache_ttl,
+            "schema": schema,
+            "rate_limit": rate_limit,
+            "priority": priority,
+            "executor": executor,
+        }
 
         return func
 
     return decorator
 
 
+def _is_method(func):
+    """Whether a route is defined in a class body, and so takes a cog first."""
+    parts = func.__qualname__.split(".")
+
+    return len(parts) > 1 and parts[-2] != "<locals>"
+
+
+def _is_typed_route(func):
+    """Whether a route takes the request data as keyword arguments.
+
+    Routes taking a single unannotated parameter, or one annotated as
+    :class:`IpcServerResponse`, are passed the request object instead.
+    """
+    parameters = list(inspect.signature(func).parameters.values())
+
+    if _is_method(func):
+        parameters = parameters[1:]
+
+    if len(parameters) != 1:
+        return True
+
+    (parameter,) = parameters
+
+    if parameter.kind not in (parameter.POSITIONAL_ONLY, parameter.POSITIONAL_OR_KEYWORD):
+        return True
+
+    annotation = parameter.annotation
+
+    if isinstance(annotation, str):
+        return annotation != "IpcServerResponse"
+
+    return annotation is not parameter.empty and annotation is not IpcServerResponse
+
+
 class IpcServerResponse:
-    def __init__(self, data):
+    """The request data passed to a route.
+
+    Fields of the request data are read as attributes, straight from the
+    received payload.
+
+    Attributes
+    ----------
+    endpoint: str
+        The endpoint requested.
+    length: Optional[int]
+        The size, in bytes, of the message the request was received in.
+        Requests of a batch share the size of the whole batch.
+    """
+
+    __slots__ = ("endpoint", "length", "_data", "_json")
+
+    def __init__(self, data, length=None):
         self._json = data
-        self.length = len(data)
+        self._data = data.get("data") or {}
 
         self.endpoint = data["endpoint"]
+        self.length = length
+
+    def __getattr__(self, name):
+        try:
+            return self._data[name]
+        except KeyError:
+            raise AttributeError(
+                "{0.__class__.__name__!r} has no attribute {1!r}".format(self, name)
+            ) from None
+
+    def __reduce__(self):
+        # Unpickling would otherwise look up _data through __getattr__ before it is set.
+        return self.__class__, (self._json, self.length)
+
+    def __contains__(self, name):
+        return name in self._data
+
+    def get(self, name, default=None):
+        """Returns a field of the request data, or ``default`` if it was not sent."""
+        return self._data.get(name, default)
 
-        for key, value in data["data"].items():
-            setattr(self, key, value)
+    def to_dict(self):
+        """Returns the request data."""
+        return self._data
 
     def to_json(self):
         return self._json
@@ -49,6 +205,102 @@ class IpcServerResponse:
         return self.__repr__()
 
 
+class IpcServerConnection:
+    """The state the server keeps for a single client websocket connection.
+
+    Attributes
+    ----------
+    websocket: :class:`~aiohttp.web.WebSocketResponse`
+        The websocket connection to the client.
+    serializer: :class:`~discord.ext.ipc.serializers.Serializer`
+        The wire format negotiated with the client.
+    tasks: Dict[int, :class:`asyncio.Task`]
+        The requests being processed as tasks, by nonce.
+    streams: Dict[int, :class:`asyncio.Semaphore`]
+        The chunks each open stream may still send before the client has to
+        acknowledge them, by nonce.
+    subscriptions: Set[str]
+        The events published to this client.
+    bucket: Optional[:class:`~discord.ext.ipc.ratelimit.TokenBucket`]
+        The rate limit of the connection.
+    greeted: bool
+        Whether the client opened the connection with the ``hello`` handshake.
+        Only such clients tell messages pushed by the server apart from
+        responses; older ones read one message per request.
+    authenticated: bool
+        Whether the client proved it has the secret key when the connection
+        opened. Requests of clients which didn't must carry the key instead.
+    compression: Optional[:class:`~discord.ext.ipc.compression.Compression`]
+        Compresses large responses, once the client said it can decompress them.
+    compressed_requests: bool
+        Whether the client offered zlib in its ``hello``, and so may send
+        compressed requests.
+    handler: Optional[:class:`asyncio.Task`]
+        The task reading requests from the connection.
+    label: Callable[[dict], str]
+        Returns the name the metrics of a request are recorded under.
+    """
+
+    def __init__(self, websocket, serializer, metrics=None, rate_limit=None):
+        self.websocket = websocket
+        self.handler = _current_task()
+        self.label = request_label
+        self.serializer = serializer
+        self.metrics = metrics
+        self.bucket = bucket(rate_limit)
+
+        self.greeted = False
+        self.authenticated = False
+        self.challenge = None
+        self.compression = None
+        self.compressed_requests = False
+
+        self.tasks = {}
+        self.streams = {}
+        self.subscriptions = set()
+
+    async def send(self, obj, request=None, executor=None):
+        """Serializes and sends an object to the client.
+
+        The payload size is counted under the endpoint of ``request`` when
+        the server records metrics. The object is serialized in ``executor``
+        if one is given.
+        """
+        if executor is None:
+            data = self.serializer.dumps(obj)
+        else:
+            data = await asyncio.get_event_loop().run_in_executor(
+                executor, self.serializer.dumps, obj
+            )
+
+        size = await self.serializer.send_dumped(self.websocket, data, self.compression)
+
+        if self.metrics is not None and request is not None:
+            self.metrics.sent(self.label(request), size, len(data) - size)
+
+    def open_stream(self, nonce, window):
+        """Starts tracking how many chunks a stream may send unacknowledged."""
+        credit = asyncio.Semaphore(max(1, int(window)))
+        self.streams[nonce] = credit
+
+        return credit
+
+    def ack(self, nonce, count):
+        """Allows a stream to send ``count`` more chunks."""
+        credit = self.streams.get(nonce)
+
+        if credit is not None:
+            for _ in range(count):
+                credit.release()
+
+    def cancel(self, nonce):
+        """Cancels the task processing a request, if it is still running."""
+        task = self.tasks.get(nonce)
+
+        if task is not None:
+            task.cancel()
+
+
 class Server:
     """The IPC server. Usually used on the bot process for receiving
     requests from the client.
@@ -60,26 +312,99 @@ class Server:
     host: str
         The host to run the IPC Server on. Defaults to localhost.
     port: int
-        The port to run the IPC Server on. Defaults to 8765.
+        The port to run the IPC Server on. If None, the server is only
+        reachable through ``path``. Defaults to 8765.
+    path: str
+        The path of a Unix domain socket to also run the IPC Server on.
+        Clients on the same host can connect through it to skip the TCP
+        loopback. Defaults to None
     secret_key: str
         A secret key. Used for authentication and should be the same as
         your client's secret key.
     do_multicast: bool
-        Turn multicasting on/off. Defaults to True
+        Turn multicasting on/off. The first server on a host to start runs
+        the multicast server, and later ones register with it, so clients
+        can discover all of them. Defaults to True
     multicast_port: int
         The port to run the multicasting server on. Defaults to 20000
+    heartbeat_interval: float
+        How often, in seconds, a server registered with the multicast
+        server of another one tells it that it is still healthy. Defaults to 10
+    concurrent: bool
+        Dispatch each request as its own task instead of processing
+        requests on a connection one at a time. Responses are sent as
+        soon as their route finishes. Defaults to False
+    max_concurrency: int
+        The maximum number of requests processed at once on a single
+        connection when ``concurrent`` is enabled, and separately of streams
+        sent at once. Further ones wait for a slot. Defaults to 100
+    serializers: List[str]
+        The wire formats the server accepts, in order of preference.
+        ``"orjson"`` and ``"msgpack"`` are used when installed and the
+        client supports them. JSON is always accepted. Defaults to ``["json"]``
+    route_cache_size: int
+        The approximate number of bytes memoized route responses may take
+        up before the least recently used ones are evicted. Defaults to 16 MiB
+    metrics: Union[bool, :class:`~discord.ext.ipc.metrics.Metrics`]
+        Record per-endpoint request counts, latencies, payload sizes and
+        errors, read with :meth:`stats`. Defaults to False
+    metrics_path: str
+        Also serve the metrics in the Prometheus text format over HTTP at
+        this path of the IPC server, e.g. ``"/metrics"``. The path is not
+        protected by the secret key. Defaults to None
+    tracer
+        An OpenTelemetry-style tracer. Each route call is wrapped in a span
+        started with ``tracer.start_as_current_span``. Defaults to None
+    rate_limit: Tuple[int, float]
+        Allow each connection ``rate`` requests every ``per`` seconds, with
+        a batch counting as one request per item. Requests over the limit
+        get a 429 response. Defaults to None
+    max_in_flight: int
+        The maximum number of requests running at once across every
+        connection. Further requests get a 503 response, depending on the
+        ``priority`` of their route. Defaults to None
+    compression_threshold: int
+        Compress responses of at least this many bytes with zlib before
+        sending them, for clients which support it. Worth it when the
+        client is on another host. Defaults to None, for no compression
+    compression_level: int
+        The zlib compression level, from 1 (fastest) to 9 (smallest).
+        Defaults to 6
+    thread_workers: int
+        The size of the thread pool routes with ``executor="thread"`` run
+        in. Defaults to the :class:`~concurrent.futures.ThreadPoolExecutor`
+        default
+    process_workers: int
+        The size of the process pool routes with ``executor="process"`` run
+        in. Defaults to the number of CPUs
     """
 
     ROUTES = {}
+    ROUTE_OPTIONS = {}
 
     def __init__(
         self,
         bot,
         host="localhost",
         port=8765,
+        path=None,
         secret_key=None,
         do_multicast=True,
         multicast_port=20000,
+        heartbeat_interval=10.0,
+        concurrent=False,
+        max_concurrency=100,
+        serializers=("json",),
+        route_cache_size=16 * 1024 * 1024,
+        metrics=False,
+        metrics_path=None,
+        tracer=None,
+        rate_limit=None,
+        max_in_flight=None,
+        compression_threshold=None,
+        compression_level=6,
+        thread_workers=None,
+        process_workers=None,
     ):
         self.bot = bot
         self.loop = bot.loop
@@ -88,16 +413,118 @@ class Server:
 
         self.host = host
         self.port = port
+        self.path = path
 
         self._server = None
         self._multicast_server = None
 
         self.do_multicast = do_multicast
         self.multicast_port = multicast_port
+        self.heartbeat_interval = heartbeat_interval
+
+        self.registry = Registry(self, heartbeat_interval)
+        self._registration = None
+
+        self.concurrent = concurrent
+        self.max_concurrency = max_concurrency
+
+        self.serializers = resolve_serializers(serializers)
 
         self.endpoints = {}
+        self.route_options = {}
+
+        self.route_cache = ResponseCache(max_size=route_cache_size)
+
+        if metrics is True:
+            metrics = Metrics(namespace="discord_ipc_server")
 
-    def route(self, name=None):
+        self.metrics = metrics or None
+        self.metrics_path = metrics_path
+        self.tracer = tracer
+
+        self.rate_limit = rate_limit
+        self.max_in_flight = max_in_flight
+
+        self.compression = None
+
+        if compression_threshold is not None:
+            self.compression = Compression(compression_threshold, compression_level)
+
+        self.thread_workers = thread_workers
+        self.process_workers = process_workers
+
+        # Both pools are only started once a route needs them.
+        self._thread_pool = None
+        self._process_pool = None
+
+        self._runners = []
+        self._connections = set()
+        self._multicast_websockets = set()
+
+        # The dispatch table: endpoint names to callables taking just the
+        # request, with the cog of cog routes already bound.
+        self._routes = {}
+        self._route_owners = {}
+        self._streaming = set()
+        self._typed = set()
+        self._validators = {}
+        self._priorities = {}
+        self._buckets = {}
+        self._executors = {}
+
+        self._in_flight = 0
+
+        # Every request being dispatched, including those refused or waiting
+        # to send their response, which stop() drains.
+        self._dispatching = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._stopping = False
+
+        self._hook_cogs()
+
+    def _hook_cogs(self):
+        """Rebinds cog routes whenever the bot adds or removes a cog."""
+        add_cog = getattr(self.bot, "add_cog", None)
+        remove_cog = getattr(self.bot, "remove_cog", None)
+
+        if add_cog is None or remove_cog is None:
+            # Support base Client
+            return
+
+        def hook(method, cog_name):
+            @functools.wraps(method)
+            def wrapper(*args, **kwargs):
+                result = method(*args, **kwargs)
+                name = cog_name(*args, **kwargs)
+
+                # Bot.add_cog and Bot.remove_cog are coroutines on newer discord.py versions.
+                if inspect.isawaitable(result):
+
+                    async def rebind():
+                        value = await result
+                        self._bind_cog(name)
+                        return value
+
+                    return rebind()
+
+                self._bind_cog(name)
+                return result
+
+            return wrapper
+
+        self.bot.add_cog = hook(add_cog, lambda cog, *args, **kwargs: cog.qualified_name)
+        self.bot.remove_cog = hook(remove_cog, lambda name, *args, **kwargs: name)
+
+    def route(
+        self,
+        name=None,
+        cache_ttl=None,
+        schema=None,
+        rate_limit=None,
+        priority="normal",
+        executor=None,
+    ):
         """Used to register a coroutine as an endpoint when you have
         access to an instance of :class:`.Server`.
 
@@ -105,13 +532,49 @@ class Server:
         ----------
         name: str
             The endpoint name. If not provided the method name will be used.
+        cache_ttl: float
+            Memoize the route's responses by request data for this many
+            seconds. Memoized responses are dropped with :meth:`invalidate`.
+            If not provided responses are not memoized.
+        schema: Dict[str, Any]
+            Field names mapped to the type their value must have, or to a
+            ``(type, default)`` tuple for optional fields. The schema is
+            compiled once here, and requests which don't match it are
+            rejected with a 400 response before the route is called.
+        rate_limit: Tuple[int, float]
+            Allow ``rate`` requests to the route every ``per`` seconds, from
+            all clients together. Requests over the limit get a 429 response.
+        priority: str
+            ``"high"``, ``"normal"`` or ``"low"``. Once the server has
+            ``max_in_flight`` requests running, requests to normal routes get
+            a 503 response. Low routes are refused from half of that, and
+            high routes are never refused. Defaults to ``"normal"``.
+        executor: str
+            Run the route, which must then be a regular function rather than
+            a coroutine, in the server's ``"thread"`` or ``"process"`` pool
+            instead of on the bot's event loop. Its response is serialized
+            in the thread pool too. Process routes can't be cog methods or
+            be defined in the script being run, and their request data and
+            response must be picklable.
         """
+        check_priority(priority)
+        _check_executor(executor)
 
         def decorator(func):
-            if not name:
-                self.endpoints[func.__name__] = func
-            else:
-                self.endpoints[name] = func
+            _check_executor_route(func, executor)
+
+            endpoint = name or func.__name__
+
+            self.endpoints[endpoint] = func
+            self.route_options[endpoint] = {
+                "cache_ttl": cache_ttl,
+                "schema": schema,
+                "rate_limit": rate_limit,
+                "priority": priority,
+                "executor": executor,
+            }
+
+            self._bind(endpoint)
 
             return func
 
@@ -119,9 +582,96 @@ class Server:
 
     def update_endpoints(self):
         """Called internally to update the server's endpoints for cog routes."""
-        self.endpoints = {**self.endpoints, **self.ROUTES}
+        for endpoint, func in self.ROUTES.items():
+            if self.endpoints.get(endpoint) is not func:
+                self.endpoints[endpoint] = func
+                self.route_options[endpoint] = self.ROUTE_OPTIONS.get(endpoint, {})
+                self._bind(endpoint)
+
+    def _bind(self, endpoint):
+        """Resolves the callable an endpoint is dispatched to."""
+        func = self.endpoints[endpoint]
+        owner = func.__qualname__.split(".")[0]
+
+        try:
+            cog = self.bot.cogs.get(owner)
+        except AttributeError:
+            # Support base Client
+            cog = None
+
+        self._routes[endpoint] = functools.partial(func, cog) if cog else func
+        self._route_owners[endpoint] = owner
+
+        options = self.route_options.get(endpoint, {})
+
+        if options.get("cache_ttl") is not None:
+            self.route_cache.ttl[endpoint] = options["cache_ttl"]
+        else:
+            self.route_cache.ttl.pop(endpoint, None)
+
+        if _is_typed_route(func):
+            schema, allow_extra = signature_schema(func, skip_self=_is_method(func))
+
+            self._typed.add(endpoint)
+            self._validators[endpoint] = compile_schema(
+                options.get("schema") or schema, allow_extra=allow_extra
+            )
+        elif options.get("schema") is not None:
+            self._typed.discard(endpoint)
+            self._validators[endpoint] = compile_schema(options["schema"])
+        else:
+            self._typed.discard(endpoint)
+            self._validators.pop(endpoint, None)
+
+        self._priorities[endpoint] = options.get("priority") or "normal"
+
+        executor = options.get("executor")
+
+        if executor is not None:
+            self._executors[endpoint] = executor
+        else:
+            self._executors.pop(endpoint, None)
+
+        limit = bucket(options.get("rate_limit"))
+
+        if limit is not None:
+            self._buckets[endpoint] = limit
+        else:
+            self._buckets.pop(endpoint, None)
 
-        self.ROUTES = {}
+        if inspect.isasyncgenfunction(func):
+            self._streaming.add(endpoint)
+        else:
+            self._streaming.discard(endpoint)
+
+    def _executor(self, kind):
+        """Returns the pool routes with ``executor=kind`` run in, starting it if needed."""
+        if kind == "process":
+            if self._process_pool is None:
+                # Forked workers would inherit the bot's event loop and gateway socket.
+                self._process_pool = ProcessPoolExecutor(
+                    max_workers=self.process_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+
+            return self._process_pool
+
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(
+                max_workers=self.thread_workers, thread_name_prefix="discord-ext-ipc"
+            )
+
+        return self._thread_pool
+
+    def _bind_cog(self, name):
+        """Rebinds the routes of a cog after it was added or removed."""
+        self.update_endpoints()
+
+        for endpoint, owner in list(self._route_owners.items()):
+            if owner == name:
+                self._bind(endpoint)
+
+        log.debug("Rebound IPC routes of cog %r", name)
 
     async def handle_accept(self, request):
         """Handles websocket requests from the client process.
@@ -131,85 +681,636 @@ class Server:
         request: :class:`~aiohttp.web.Request`
             The request made by the client, parsed by aiohttp.
         """
-        self.update_endpoints()
-
         log.info("Initiating IPC Server.")
 
-        websocket = aiohttp.web.WebSocketResponse()
+        websocket = aiohttp.web.WebSocketResponse(
+            protocols=[serializer.protocol for serializer in self.serializers],
+            max_msg_size=MAX_SIZE,
+        )
         await websocket.prepare(request)
 
-        async for message in websocket:
-            request = message.json()
+        connection = IpcServerConnection(
+            websocket, negotiated_serializer(websocket.ws_protocol), self.metrics, self.rate_limit
+        )
+        connection.label = functools.partial(self._label, connection)
+        self._connections.add(connection)
 
-            log.debug("IPC Server < %r", request)
+        # Streams get their own slots, as they can sit waiting for acknowledgements.
+        # Requests wait for a slot in their own task rather than in this loop,
+        # so acknowledgements and cancellations are always read.
+        requests = asyncio.Semaphore(self.max_concurrency)
+        streams = asyncio.Semaphore(self.max_concurrency)
 
-            endpoint = request.get("endpoint")
+        async def dispatch(semaphore, request, deadline, size):
+            async with semaphore:
+                await self._dispatch(connection, request, deadline, size)
 
-            headers = request.get("headers")
+        def dispatched(nonce, task):
+            connection.tasks.pop(nonce, None)
 
-            if not headers or headers.get("Authorization") != self.secret_key:
-                log.info("Received unauthorized request (Invalid or no token provided).")
-                response = {"error": "Invalid or no token provided.", "code": 403}
-            else:
-                if not endpoint or endpoint not in self.endpoints:
-                    log.info("Received invalid request (Invalid or no endpoint given).")
-                    response = {"error": "Invalid or no endpoint given.", "code": 400}
-                else:
-                    server_response = IpcServerResponse(request)
-                    try:
-                        attempted_cls = self.bot.cogs.get(
-                            self.endpoints[endpoint].__qualname__.split(".")[0]
-                        )
+            if not task.cancelled() and task.exception() is not None:
+                log.error("Dispatching IPC request failed", exc_info=task.exception())
 
-                        if attempted_cls:
-                            arguments = (attempted_cls, server_response)
-                        else:
-                            arguments = (server_response,)
-                    except AttributeError:
-                        # Support base Client
-                        arguments = (server_response,)
+        try:
+            async for message in websocket:
+                data = message.data
+
+                if is_compressed(data):
+                    # Inflating is only worth the risk for clients which negotiated it.
+                    if not connection.compressed_requests:
+                        log.info("Received a compressed message without negotiating compression.")
+                        await websocket.close(
+                            code=aiohttp.WSCloseCode.POLICY_VIOLATION,
+                            message=b"Compression was not negotiated",
+                        )
+                        break
 
                     try:
-                        ret = await self.endpoints[endpoint](*arguments)
-                        response = ret
-                    except Exception as error:
-                        log.error(
-                            "Received error while executing %r with %r",
-                            endpoint,
-                            request,
+                        data = decompress(data, MAX_SIZE)
+                    except ValueError as error:
+                        log.info("Received an invalid compressed message (%s).", error)
+                        await websocket.close(
+                            code=aiohttp.WSCloseCode.MESSAGE_TOO_BIG, message=b"Invalid payload"
                         )
-                        self.bot.dispatch("ipc_error", endpoint, error)
+                        break
+
+                request = connection.serializer.loads(data)
 
-                        response = {
-                            "error": "IPC route raised error of type {}".format(
-                                type(error).__name__
-                            ),
-                            "code": 500,
+                log.debug("IPC Server < %r", request)
+
+                if "hello" in request:
+                    connection.greeted = True
+                    connection.challenge = new_challenge()
+                    connection.compressed_requests = "zlib" in (request.get("compression") or ())
+
+                    if self.compression is not None and connection.compressed_requests:
+                        connection.compression = self.compression
+
+                    await connection.send(
+                        {"challenge": connection.challenge, "compression": ALGORITHMS}
+                    )
+                    continue
+
+                if "auth" in request:
+                    challenge, connection.challenge = connection.challenge, None
+
+                    if challenge is not None and verify(
+                        self.secret_key, challenge, request["auth"]
+                    ):
+                        connection.authenticated = True
+                        await connection.send({"authenticated": True})
+                        continue
+
+                    # The connection stays open, but its requests are refused
+                    # unless they carry the secret key themselves.
+                    log.info("Received unauthorized connection (Invalid signature provided).")
+                    await connection.send(
+                        {
+                            "authenticated": False,
+                            "error": "Invalid or no token provided.",
+                            "code": 403,
                         }
+                    )
+                    continue
+
+                if "ack" in request:
+                    connection.ack(request["ack"], request.get("count", 1))
+                    continue
+
+                if "cancel" in request:
+                    connection.cancel(request["cancel"])
+                    continue
+
+                # Only requests are counted, not the control messages above.
+                if self.metrics is not None:
+                    self.metrics.received(connection.label(request), len(message.data))
+
+                # Responses can only be sent out of order to clients which
+                # tag their requests with a nonce. Streams always run as
+                # tasks so that their acknowledgements can still be read.
+                nonce = request.get("nonce")
+
+                # Clients send how long they will wait for the response, rather
+                # than when they stop waiting, so the two clocks needn't agree.
+                deadline = None
+
+                if isinstance(request.get("timeout"), (int, float)):
+                    deadline = self.loop.time() + request["timeout"]
+
+                if nonce is not None and (self.concurrent or "stream" in request):
+                    semaphore = streams if "stream" in request else requests
+
+                    task = self.loop.create_task(
+                        dispatch(semaphore, request, deadline, len(message.data))
+                    )
+                    task.add_done_callback(functools.partial(dispatched, nonce))
+                    connection.tasks[nonce] = task
+                else:
+                    await self._dispatch(connection, request, deadline, len(message.data))
+        finally:
+            self._connections.discard(connection)
+
+        # Nothing can be sent on a closed connection, so there is no point
+        # waiting on streams for acknowledgements which will never come.
+        for nonce in list(connection.streams):
+            connection.cancel(nonce)
+
+        if connection.tasks:
+            await asyncio.gather(*connection.tasks.values(), return_exceptions=True)
+
+        return websocket
+
+    async def _dispatch(self, connection, request, deadline=None, size=None):
+        """Processes a single request and sends back its response.
+
+        ``size`` is the size of the message the request was received in.
+        """
+        self._dispatching += 1
+        self._idle.clear()
+
+        try:
+            return await self._dispatch_request(connection, request, deadline, size)
+        finally:
+            self._dispatching -= 1
+
+            if not self._dispatching:
+                self._idle.set()
+
+    def _label(self, connection, request):
+        """Returns the name the metrics of a request are recorded under.
+
+        Only routes which exist are used as names, so that clients can't add
+        labels of their own.
+        """
+        if not connection.authenticated:
+            headers = request.get("headers")
+
+            if not isinstance(headers, dict) or not check_key(
+                self.secret_key, headers.get("Authorization")
+            ):
+                return "<unauthorized>"
+
+        endpoint = request.get("endpoint")
+
+        if endpoint is None:
+            return request_label(request)
+
+        if isinstance(endpoint, str) and (endpoint in self._routes or endpoint in self.ROUTES):
+            return endpoint
+
+        return "<unknown>"
+
+    async def _dispatch_request(self, connection, request, deadline=None, size=None):
+        if self.metrics is None:
+            return await self._respond(connection, request, deadline, size)
+
+        endpoint = connection.label(request)
+        started = self.metrics.start(endpoint)
+        code = 500
+
+        try:
+            code = await self._respond(connection, request, deadline, size)
+        except asyncio.CancelledError:
+            code = "cancelled"
+            raise
+        finally:
+            self.metrics.finish(endpoint, started, code)
+
+    async def _respond(self, connection, request, deadline=None, size=None):
+        """Processes a single request and sends back its response, returning its code."""
+        response = self._admit(connection, request)
+
+        if response is None:
+            self._in_flight += 1
 
             try:
-                await websocket.send_json(response)
-                log.debug("IPC Server > %r", response)
-            except TypeError as error:
-                if str(error).startswith("Object of type") and str(error).endswith(
-                    "is not JSON serializable"
-                ):
-                    error_response = (
-                        "IPC route returned values which are not able to be sent over sockets."
-                        " If you are trying to send a discord.py object,"
-                        " please only send the data you need."
+                if deadline is None:
+                    response = await self._process(connection, request, size)
+                else:
+                    response = await self._process_before(connection, request, deadline, size)
+            finally:
+                self._in_flight -= 1
+
+        if inspect.isasyncgen(response):
+            if "stream" in request and "nonce" in request:
+                return await self._stream(connection, request, response)
+
+            response = await self._collect(request.get("endpoint"), request, response)
+
+        code = response_code(response)
+
+        if "nonce" in request:
+            response = {"nonce": request["nonce"], "data": response}
+
+        executor = None
+
+        endpoint = request.get("endpoint")
+
+        if isinstance(endpoint, str) and endpoint in self._executors:
+            # Responses of routes heavy enough to run off the loop are likely large.
+            executor = self._executor("thread")
+
+        try:
+            await connection.send(response, request, executor)
+            log.debug("IPC Server > %r", response)
+        except JSONEncodeError as error:
+            await self._send_encode_error(connection, request, error)
+
+        return code
+
+    def _admit(self, connection, request):
+        """Returns the response refusing a request, or None if it may be processed."""
+        if self._stopping:
+            # Clients were told to send new requests elsewhere.
+            log.info("Refused request for %r, the server is stopping.", request_label(request))
+            return {"error": "Server is shutting down, try again later.", "code": 503}
+
+        if "endpoint" in request and not isinstance(request["endpoint"], str):
+            log.info("Received invalid request (Invalid or no endpoint given).")
+            return {"error": "Invalid or no endpoint given.", "code": 400}
+
+        if connection.bucket is not None:
+            batch = request.get("batch")
+            cost = len(batch) if isinstance(batch, list) else 1
+
+            retry_after = connection.bucket.acquire(cost)
+
+            if retry_after:
+                log.info("Rate limited request for %r.", request_label(request))
+                return rate_limited(retry_after)
+
+        if self.max_in_flight is not None:
+            if "endpoint" in request:
+                priority = self._priorities.get(request["endpoint"], "normal")
+            elif "batch" in request:
+                priority = "normal"
+            else:
+                # info and subscriptions are cheap and keep clients working.
+                priority = "high"
+
+            share = PRIORITIES[priority]
+
+            if share is not None and self._in_flight >= self.max_in_flight * share:
+                log.info("Shed %s priority request for %r.", priority, request_label(request))
+                return {"error": "Server is overloaded, try again later.", "code": 503}
+
+        return None
+
+    async def _process_before(self, connection, request, deadline, size=None):
+        """Processes a request, giving up on it once the client has stopped waiting."""
+        timeout = deadline - self.loop.time()
+
+        try:
+            if timeout <= 0:
+                # Queued behind other requests for longer than the client waits.
+                raise asyncio.TimeoutError
+
+            return await asyncio.wait_for(self._process(connection, request, size), timeout)
+        except asyncio.TimeoutError:
+            log.info(
+                "Gave up on request for %r after its deadline passed.", request.get("endpoint")
+            )
+            return {"error": "Request timed out.", "code": 504}
+
+    async def _send_encode_error(self, connection, request, error):
+        """Tells the client its response could not be serialized."""
+        error_response = (
+            "IPC route returned values which are not able to be sent over sockets."
+            " If you are trying to send a discord.py object,"
+            " please only send the data you need."
+        )
+        log.error("%s (%s)", error_response, error)
+
+        response = {"error": error_response, "code": 500}
+
+        if "nonce" in request:
+            response = {"nonce": request["nonce"], "data": response}
+
+        await connection.send(response, request)
+        log.debug("IPC Server > %r", response)
+
+        raise JSONEncodeError(error_response) from error
+
+    async def _stream(self, connection, request, generator):
+        """Sends the items of a streaming route as chunks, as the client acknowledges them."""
+        endpoint = request.get("endpoint")
+        nonce = request["nonce"]
+
+        credit = connection.open_stream(nonce, request["stream"])
+
+        try:
+            while True:
+                try:
+                    item = await generator.__anext__()
+                except StopAsyncIteration:
+                    break
+                except Exception as error:
+                    response = self._route_error(endpoint, request, error)
+                    await connection.send({"nonce": nonce, "data": response}, request)
+                    return response_code(response)
+
+                await credit.acquire()
+
+                try:
+                    await connection.send({"nonce": nonce, "chunk": item}, request)
+                except JSONEncodeError as error:
+                    await self._send_encode_error(connection, request, error)
+
+            await connection.send({"nonce": nonce, "end": True}, request)
+            log.debug("IPC Server > end of stream %r", nonce)
+
+            return 200
+        finally:
+            connection.streams.pop(nonce, None)
+            await generator.aclose()
+
+    async def _collect(self, endpoint, request, generator):
+        """Collects the items of a streaming route into a list, for clients not streaming it."""
+        items = []
+
+        try:
+            async for item in generator:
+                items.append(item)
+        except Exception as error:
+            return self._route_error(endpoint, request, error)
+
+        return items
+
+    async def _process(self, connection, request, size=None):
+        """Runs the route, or routes, a request is for and returns its response."""
+        if not connection.authenticated:
+            headers = request.get("headers")
+
+            if not headers or not check_key(self.secret_key, headers.get("Authorization")):
+                log.info("Received unauthorized request (Invalid or no token provided).")
+                return {"error": "Invalid or no token provided.", "code": 403}
+
+        if "info" in request:
+            return self.info()
+
+        if "subscribe" in request or "unsubscribe" in request:
+            connection.subscriptions.update(request.get("subscribe") or ())
+            connection.subscriptions.difference_update(request.get("unsubscribe") or ())
+
+            log.debug("Client subscribed to %r", connection.subscriptions)
+            return {"subscribed": sorted(connection.subscriptions)}
+
+        if "batch" in request:
+            batch = request["batch"]
+
+            if not isinstance(batch, list) or not all(isinstance(item, dict) for item in batch):
+                log.info("Received invalid request (Invalid batch given).")
+                return {"error": "Invalid batch given.", "code": 400}
+
+            log.debug("Running a batch of %d requests", len(batch))
+            return list(
+                await asyncio.gather(*(self._process_batched(item, size) for item in batch))
+            )
+
+        return await self._process_endpoint(request, size)
+
+    async def _process_batched(self, request, size=None):
+        response = await self._process_endpoint(request, size)
+
+        if inspect.isasyncgen(response):
+            return await self._collect(request.get("endpoint"), request, response)
+
+        return response
+
+    async def _process_endpoint(self, request, size=None):
+        """Runs the route of a single, already authorized, request."""
+        endpoint = request.get("endpoint")
+
+        if not isinstance(endpoint, str):
+            endpoint = None
+
+        if endpoint and endpoint not in self._routes and endpoint in self.ROUTES:
+            # A route registered with route() since the last cog was added.
+            self.update_endpoints()
+
+        if not endpoint or endpoint not in self._routes:
+            log.info("Received invalid request (Invalid or no endpoint given).")
+            return {"error": "Invalid or no endpoint given.", "code": 400}
+
+        limit = self._buckets.get(endpoint)
+
+        if limit is not None:
+            retry_after = limit.acquire()
+
+            if retry_after:
+                log.info("Rate limited request for %r.", endpoint)
+                return rate_limited(retry_after)
+
+        # Streaming routes hand back a generator, which can't be memoized.
+        if endpoint in self._streaming:
+            return await self._call_route(endpoint, request, size)
+
+        return await self.route_cache.fetch(
+            endpoint,
+            request.get("data"),
+            functools.partial(self._call_route, endpoint, request, size),
+        )
+
+    async def _call_route(self, endpoint, request, size=None):
+        """Calls the route for an endpoint, turning errors into error responses."""
+        if self.tracer is None:
+            return await self._invoke(endpoint, request, size)
+
+        with self.tracer.start_as_current_span(
+            "ipc.route {}".format(endpoint), attributes={"ipc.endpoint": endpoint}
+        ) as span:
+            response = await self._invoke(endpoint, request, size)
+            span.set_attribute("ipc.code", response_code(response))
+
+            return response
+
+    async def _invoke(self, endpoint, request, size=None):
+        """Validates the request data and calls the route with it."""
+        validate = self._validators.get(endpoint)
+
+        if validate is not None:
+            try:
+                request["data"] = validate(request.get("data") or {})
+            except ValidationError as error:
+                log.info("Received invalid request for %r (%s).", endpoint, error)
+                return {"error": str(error), "code": 400, "fields": error.errors}
+
+        try:
+            executor = self._executors.get(endpoint)
+
+            if executor is not None:
+                if endpoint in self._typed:
+                    func = functools.partial(self._routes[endpoint], **request["data"])
+                else:
+                    func = functools.partial(
+                        self._routes[endpoint], IpcServerResponse(request, size)
                     )
-                    log.error(error_response)
 
-                    response = {"error": error_response, "code": 500}
+                return await self.loop.run_in_executor(self._executor(executor), func)
+
+            if endpoint in self._typed:
+                call = self._routes[endpoint](**request["data"])
+            else:
+                call = self._routes[endpoint](IpcServerResponse(request, size))
+
+            if endpoint in self._streaming:
+                return call
+
+            return await call
+        except asyncio.CancelledError:
+            # Not an error of the route: the request was cancelled or timed out.
+            raise
+        except Exception as error:
+            return self._route_error(endpoint, request, error)
+
+    def _route_error(self, endpoint, request, error):
+        """Reports an error raised by a route and returns the error response for it."""
+        log.error(
+            "Received error while executing %r with %r",
+            endpoint,
+            request,
+        )
+        self.bot.dispatch("ipc_error", endpoint, error)
+
+        return {
+            "error": "IPC route raised error of type {}".format(type(error).__name__),
+            "code": 500,
+        }
+
+    def info(self):
+        """Returns what the server tells clients about itself.
+
+        Returns
+        -------
+        dict
+            The ``endpoints`` the server has, the ``schemas`` of the routes
+            which have one, and the ``shard_ids`` and ``shard_count`` of the bot.
+        """
+        shard_ids, shard_count = self._shards()
+
+        return {
+            "endpoints": sorted(self.endpoints),
+            "schemas": {
+                endpoint: validate.schema for endpoint, validate in self._validators.items()
+            },
+            "shard_ids": shard_ids,
+            "shard_count": shard_count,
+        }
+
+    def registry_entry(self):
+        """Returns what the multicast server lists about this server.
+
+        Returns
+        -------
+        dict
+            The ``host``, ``port`` and ``path`` the server is reachable at, the
+            ``shard_ids`` and ``shard_count`` of the bot, and the number of
+            requests ``in_flight``.
+        """
+        shard_ids, shard_count = self._shards()
+
+        return {
+            "host": self.host,
+            "port": self.port,
+            "path": self.path,
+            "shard_ids": shard_ids,
+            "shard_count": shard_count,
+            "in_flight": self._in_flight,
+        }
+
+    def _shards(self):
+        shard_ids = getattr(self.bot, "shard_ids", None)
 
-                    await websocket.send_json(response)
-                    log.debug("IPC Server > %r", response)
+        if shard_ids is None and getattr(self.bot, "shard_id", None) is not None:
+            shard_ids = [self.bot.shard_id]
 
-                    raise JSONEncodeError(error_response)
+        return (
+            list(shard_ids) if shard_ids is not None else None,
+            getattr(self.bot, "shard_count", None),
+        )
+
+    def stats(self):
+        """Returns the metrics recorded by the server.
+
+        Returns
+        -------
+        Optional[dict]
+            See :meth:`~discord.ext.ipc.metrics.Metrics.stats`, or None if the
+            server was not created with ``metrics`` enabled.
+        """
+        if self.metrics is None:
+            return None
+
+        return self.metrics.stats()
+
+    async def handle_metrics(self, request):
+        """Serves the recorded metrics in the Prometheus text format.
+
+        Parameters
+        ----------
+        request: :class:`~aiohttp.web.Request`
+            The request made by the scraper, parsed by aiohttp.
+        """
+        return aiohttp.web.Response(
+            text=self.metrics.prometheus(), content_type="text/plain", charset="utf-8"
+        )
+
+    async def publish(self, event, data=None):
+        """Pushes an event to every connected client subscribed to it.
+
+        Parameters
+        ----------
+        event: str
+            The name of the event.
+        data
+            The data to send with the event. Must be serializable like a route response.
+        """
+        message = {"event": event, "data": data}
+
+        log.debug("IPC Server > %r", message)
+
+        for connection in list(self._connections):
+            if event not in connection.subscriptions:
+                continue
+
+            try:
+                await connection.send(message)
+            except ConnectionResetError:
+                pass
+
+    async def invalidate(self, endpoint, **kwargs):
+        """Drops memoized responses for an endpoint, and tells every connected
+        client to drop its cached responses for it too.
+
+        Clients without a :class:`~discord.ext.ipc.cache.ResponseCache` ignore this, and
+        clients from before the ``hello`` handshake aren't told.
+
+        Parameters
+        ----------
+        endpoint: str
+            The endpoint to invalidate responses of.
+        **kwargs
+            The request data to invalidate the response for. If not supplied
+            every cached response of the endpoint is invalidated.
+        """
+        self.route_cache.invalidate(endpoint, kwargs or None)
+
+        message = {"invalidate": endpoint, "data": kwargs or None}
+
+        log.debug("IPC Server > %r", message)
+
+        for connection in list(self._connections):
+            if not connection.greeted:
+                continue
+
+            try:
+                await connection.send(message)
+            except ConnectionResetError:
+                pass
 
     async def handle_multicast(self, request):
-        """Handles multicasting websocket requests from the client.
+        """Handles multicasting websocket requests from the client, and
+        registrations from other servers.
 
         Parameters
         ----------
@@ -220,45 +1321,247 @@ class Server:
         websocket = aiohttp.web.WebSocketResponse()
         await websocket.prepare(request)
 
-        async for message in websocket:
-            request = message.json()
+        self._multicast_websockets.add(websocket)
 
-            log.debug("Multicast Server < %r", request)
+        try:
+            async for message in websocket:
+                request = message.json()
 
-            headers = request.get("headers")
+                log.debug("Multicast Server < %r", request)
 
-            if not headers or headers.get("Authorization") != self.secret_key:
-                response = {"error": "Invalid or no token provided.", "code": 403}
-            else:
-                response = {
-                    "message": "Connection success",
-                    "port": self.port,
-                    "code": 200,
-                }
+                headers = request.get("headers")
+
+                if not headers or not check_key(self.secret_key, headers.get("Authorization")):
+                    response = {"error": "Invalid or no token provided.", "code": 403}
+                elif "heartbeat" in request:
+                    self.registry.register(websocket, request["heartbeat"])
+                    continue
+                elif "register" in request:
+                    self.registry.register(websocket, request["register"])
+                    log.info("Registered IPC server %r", request["register"])
+
+                    response = {"message": "Registered", "code": 200}
+                elif "servers" in request:
+                    response = {"servers": self.registry.servers(), "code": 200}
+                else:
+                    response = {
+                        "message": "Connection success",
+                        "port": self.port,
+                        "path": self.path,
+                        "servers": self.registry.servers(),
+                        "code": 200,
+                    }
+
+                log.debug("Multicast Server > %r", response)
+
+                await websocket.send_json(response)
+        finally:
+            self._multicast_websockets.discard(websocket)
+            self.registry.unregister(websocket)
+
+        return websocket
+
+    async def _host_multicast(self):
+        """Starts the multicast server, returning whether its port was free."""
+        application = aiohttp.web.Application()
+        application.router.add_route("GET", "/", self.handle_multicast)
+
+        try:
+            await self.__start(application, self.multicast_port)
+        except OSError as error:
+            log.debug("Multicast port %d is taken (%s)", self.multicast_port, error)
+            return False
+
+        self._multicast_server = application
 
-            log.debug("Multicast Server > %r", response)
+        return True
 
-            await websocket.send_json(response)
+    async def _register(self):
+        """Keeps this server registered with the multicast server of another server,
+        taking over from it if it goes away."""
+        url = "ws://{0.host}:{0.multicast_port}".format(self)
+        headers = {"Authorization": self.secret_key}
+        attempt = 0
 
-    async def __start(self, application, port):
+        async with aiohttp.ClientSession() as session:
+            while True:
+                try:
+                    async with session.ws_connect(url) as websocket:
+                        await websocket.send_json(
+                            {"register": self.registry_entry(), "headers": headers}
+                        )
+
+                        while True:
+                            try:
+                                message = await websocket.receive(timeout=self.heartbeat_interval)
+                            except asyncio.TimeoutError:
+                                await websocket.send_json(
+                                    {"heartbeat": self.registry_entry(), "headers": headers}
+                                )
+                                continue
+
+                            if message.type != aiohttp.WSMsgType.TEXT:
+                                break
+
+                            response = message.json()
+
+                            if response.get("code") == 403:
+                                log.error(
+                                    "The multicast server at %s refused to register this server: %s",
+                                    url,
+                                    response.get("error"),
+                                )
+                                return
+
+                            log.info("Registered with the multicast server at %s", url)
+                            attempt = 0
+                except (aiohttp.ClientError, OSError) as error:
+                    log.debug("Registering with the multicast server failed (%s)", error)
+
+                if await self._host_multicast():
+                    log.info("Took over the multicast server on port %d", self.multicast_port)
+                    return
+
+                delay = min(30, 2**attempt)
+                attempt += 1
+
+                log.warning(
+                    "Lost the multicast server at %s. Registering again in %d seconds.", url, delay
+                )
+                await asyncio.sleep(delay)
+
+    async def __start(self, application, port, path=None):
         """Start both servers"""
         runner = aiohttp.web.AppRunner(application)
         await runner.setup()
 
-        site = aiohttp.web.TCPSite(runner, self.host, port)
-        await site.start()
+        try:
+            if port is not None:
+                site = aiohttp.web.TCPSite(runner, self.host, port)
+                await site.start()
+
+            if path is not None:
+                site = aiohttp.web.UnixSite(runner, path)
+                await site.start()
+        except OSError:
+            await runner.cleanup()
+            raise
+
+        self._runners.append(runner)
 
     def start(self):
         """Starts the IPC server."""
+        self.loop.run_until_complete(self._start())
+
+    async def _start(self):
+        self.update_endpoints()
+
         self.bot.dispatch("ipc_ready")
 
         self._server = aiohttp.web.Application()
         self._server.router.add_route("GET", "/", self.handle_accept)
 
-        if self.do_multicast:
-            self._multicast_server = aiohttp.web.Application()
-            self._multicast_server.router.add_route("GET", "/", self.handle_multicast)
+        if self.metrics is not None and self.metrics_path:
+            self._server.router.add_route("GET", self.metrics_path, self.handle_metrics)
+
+        await self.__start(self._server, self.port, self.path)
+
+        if self.do_multicast and not await self._host_multicast():
+            log.info(
+                "Multicast port %d is taken, registering with the server running it.",
+                self.multicast_port,
+            )
+            self._registration = self.loop.create_task(self._register())
+
+    async def stop(self, timeout=30.0):
+        """Shuts the IPC server down gracefully.
+
+        The server stops accepting connections and tells connected clients
+        to send new requests elsewhere, so that clients reconnect to the
+        server replacing it. Requests which reach a route after this get a
+        503 response, and the requests already being processed are given
+        ``timeout`` seconds to be responded to, after which the routes still
+        running are cancelled, the connections are closed and the ports are
+        released.
+
+        Parameters
+        ----------
+        timeout: float
+            How long, in seconds, to wait for requests in flight to be
+            responded to. Defaults to 30
+        """
+        self._stopping = True
+
+        if self._registration is not None:
+            self._registration.cancel()
+            self._registration = None
+
+        for runner in self._runners:
+            for site in list(runner.sites):
+                await site.stop()
+
+        log.info("Stopping IPC Server, draining %d requests.", self._dispatching)
+
+        for connection in list(self._connections):
+            # Older clients would take this as the response to their next request.
+            if not connection.greeted:
+                continue
+
+            try:
+                await connection.send({"closing": True})
+            except ConnectionResetError:
+                pass
+
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            log.warning(
+                "%d IPC requests were still running after %s seconds, cancelling them.",
+                self._dispatching,
+                timeout,
+            )
+
+            for connection in list(self._connections):
+                for task in list(connection.tasks.values()):
+                    task.cancel()
+
+        websockets = [connection.websocket for connection in self._connections]
+        websockets.extend(self._multicast_websockets)
+
+        await asyncio.gather(
+            *(
+                websocket.close(code=aiohttp.WSCloseCode.GOING_AWAY, message=b"Server shutdown")
+                for websocket in websockets
+            ),
+            return_exceptions=True,
+        )
+
+        # Connections still open are stuck in a route run outside of a task.
+        for connection in list(self._connections):
+            if connection.handler is not None:
+                connection.handler.cancel()
+
+        runners, self._runners = self._runners, []
+
+        for runner in runners:
+            await runner.cleanup()
+
+        self._server = None
+        self._multicast_server = None
+
+        for pool in (self._thread_pool, self._process_pool):
+            if pool is not None:
+                pool.shutdown(wait=False)
+
+        self._thread_pool = None
+        self._process_pool = None
+        self._stopping = False
+
+        log.info("IPC Server stopped.")
 
-            self.loop.run_until_complete(self.__start(self._multicast_server, self.multicast_port))
+    async def __aenter__(self):
+        await self._start()
+        return self
 
-        self.loop.run_until_complete(self.__start(self._server, self.port))
+    async def __aexit__(self, *exc_info):
+        await self.stop()
@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import threading
+
+from discord.ext.ipc.client import Client
+
+log = logging.getLogger(__name__)
+
+
+class SyncClient:
+    """
+    Handles requests to the bot process from synchronous code, such as the
+    worker threads of a Django or Flask app.
+
+    The :class:`~discord.ext.ipc.client.Client` runs on an event loop in a
+    background thread owned by the ``SyncClient``, so its pooled connections are
+    opened once and shared by every thread. Each method blocks the calling
+    thread until the event loop thread has its result, and may be called from
+    any number of threads at once.
+
+    .. code-block:: python
+
+        ipc_client = ipc.SyncClient(secret_key="my_secret_key", pool_size=4)
+
+        def member_count(request):
+            return ipc_client.request("get_member_count", guild_id=12345678)
+
+    Parameters
+    ----------
+    **options
+        Passed to the :class:`~discord.ext.ipc.client.Client`
+
+    Attributes
+    ----------
+    client: :class:`~discord.ext.ipc.client.Client`
+        The client running in the background thread. Its coroutines must only
+        be run on :attr:`loop`.
+    loop: :class:`asyncio.AbstractEventLoop`
+        The event loop of the background thread.
+    """
+
+    def __init__(self, **options):
+        self.loop = asyncio.new_event_loop()
+
+        self._thread = threading.Thread(
+            target=self._run_loop, name="discord-ext-ipc-client", daemon=True
+        )
+        self._thread.start()
+
+        # The client binds to the event loop it is created on.
+        self.client = self._run(self._create_client(options))
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.close()
+
+    async def _create_client(self, options):
+        return Client(**options)
+
+    def _run(self, coro):
+        if not self._thread.is_alive():
+            coro.close()
+            raise RuntimeError("The SyncClient is closed")
+
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError("SyncClient methods can't be called from its event loop")
+
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def request(self, endpoint, request_timeout=None, **kwargs):
+        """Make a request to the IPC server process, blocking until it is responded to.
+
+        Parameters
+        ----------
+        endpoint: str
+            The endpoint to request on the server
+        request_timeout: float
+            See :meth:`~discord.ext.ipc.client.Client.request`
+        **kwargs
+            The data to send to the endpoint
+        """
+        return self._run(self.client.request(endpoint, request_timeout=request_timeout, **kwargs))
+
+    def batch(self, requests, request_timeout=None):
+        """Make several requests to the IPC server process in a single message.
+
+        See :meth:`~discord.ext.ipc.client.Client.batch`.
+        """
+        return self._run(self.client.batch(requests, request_timeout=request_timeout))
+
+    def stream(self, endpoint, **kwargs):
+        """Stream the response of an endpoint from the IPC server process.
+
+        Returns a generator over the items of the response, each fetched from
+        the background thread as it is needed. Closing the generator early
+        cancels the stream. See :meth:`~discord.ext.ipc.client.Client.stream`.
+        """
+        stream = self._run(self._open_stream(endpoint, kwargs))
+
+        try:
+            while True:
+                try:
+                    yield self._run(stream.__anext__())
+                except StopAsyncIteration:
+                    return
+        finally:
+            if self._thread.is_alive():
+                self._run(stream.aclose())
+
+    async def _open_stream(self, endpoint, kwargs):
+        return self.client.stream(endpoint, **kwargs)
+
+    def info(self):
+        """See :meth:`~discord.ext.ipc.client.Client.info`."""
+        return self._run(self.client.info())
+
+    def schemas(self):
+        """See :meth:`~discord.ext.ipc.client.Client.schemas`."""
+        return self._run(self.client.schemas())
+
+    def subscribe(self, event, callback):
+        """See :meth:`~discord.ext.ipc.client.Client.subscribe`.
+
+        The callback is called on the background thread, so it must not block.
+        """
+        self._run(self.client.subscribe(event, callback))
+
+    def unsubscribe(self, event, callback=None):
+        """See :meth:`~discord.ext.ipc.client.Client.unsubscribe`."""
+        self._run(self.client.unsubscribe(event, callback))
+
+    def stats(self):
+        """See :meth:`~discord.ext.ipc.client.Client.stats`."""
+        return self._run(self._stats())
+
+    async def _stats(self):
+        # Read on the event loop thread, which is the only one updating them.
+        return self.client.stats()
+
+    def close(self, timeout=10.0):
+        """Closes the connections to the server and stops the background thread.
+
+        See :meth:`~discord.ext.ipc.client.Client.close`.
+        """
+        if not self._thread.is_alive():
+            return
+
+        self._run(self.client.close(timeout))
+
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
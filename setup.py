@@ -34,6 +34,12 @@ extras_require = {
         "sphinxcontrib_trio",
         "sphinx-rtd-theme",
     ],
+    "msgpack": [
+        "msgpack",
+    ],
+    "orjson": [
+        "orjson",
+    ],
 }
 
 with open("requirements.txt") as stream: